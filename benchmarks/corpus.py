@@ -0,0 +1,232 @@
+"""
+Synthetic resume corpus for the benchmarks.
+
+Resumes are assembled from the gazetteers in respars.sqlite3 with varied
+sections, and written as PDF and DOCX files without third party libraries.
+Body length follows a log-normal distribution, so most documents are one or
+two pages with a tail of long academic CVs. Run from the repository root:
+
+    python -m benchmarks.corpus /tmp/corpus --count 200
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import zipfile
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Priya', 'Carlos', 'Fatima', 'John', 'Olga', 'Kenji', 'Amara']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Patel', 'Okafor', 'Ivanova', 'Tanaka', 'Brown', 'Miller', 'Khan']
+STREETS = ['Main St', 'Grace St', 'McAllister St', 'Oak Avenue', 'Carriage Hill', 'Broad Street']
+CITIES = [('Richmond', 'VA'), ('San Francisco', 'CA'), ('Austin', 'TX'), ('Iowa City', 'IA'),
+          ('Seattle', 'WA'), ('New York', 'NY'), ('Boston', 'MA'), ('Chicago', 'IL')]
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DEGREES = ['Bachelor of Science in Computer Science', 'Master of Science in Analytics',
+           'Master of Business Administration', 'Doctor of Philosophy in Chemistry', 'BS in Mathematics']
+TITLES = ['Software Engineer', 'Data Analyst', 'Research Assistant', 'Project Manager', 'Consultant']
+DUTIES = ['Designed and maintained services used by thousands of customers.',
+          'Analysed data and reported findings to senior management.',
+          'Led a team of four engineers through two product releases.',
+          'Automated reporting, reducing manual work by half.']
+HEADINGS = {
+    'objective': ['OBJECTIVE', 'Career Summary', 'PROFESSIONAL SUMMARY'],
+    'education': ['EDUCATION', 'Educational Background', 'ACADEMIC BACKGROUND'],
+    'experience': ['EXPERIENCE', 'Work History', 'PROFESSIONAL EXPERIENCE'],
+    'skills': ['SKILLS', 'Technical Skills', 'COMPUTER SKILLS'],
+    'publications': ['PUBLICATIONS', 'Research', 'CONFERENCE PRESENTATIONS'],
+}
+
+
+def load_vocabulary(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            'universities': [r[0] for r in conn.execute("SELECT name FROM universities")],
+            'companies': [r[0] for r in conn.execute("SELECT name FROM companies")],
+            'skills': [r[0] for r in conn.execute("SELECT name FROM skills")],
+        }
+    finally:
+        conn.close()
+
+
+def _period(rng):
+    start = rng.randint(1995, 2016)
+    end = rng.choice(['Present', '%s %d' % (rng.choice(MONTHS), rng.randint(start, 2017))])
+    return '%s %d - %s' % (rng.choice(MONTHS), start, end)
+
+
+def make_resume(rng, vocabulary, body_lines):
+    """
+    :param rng: random.Random
+    :param vocabulary: Output of load_vocabulary()
+    :param body_lines: Approximate number of lines after the contact block
+    :return: List of lines
+    """
+    name = '%s %s' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+    city, state = rng.choice(CITIES)
+    lines = [
+        name,
+        '%d %s, %s, %s %05d' % (rng.randint(1, 9999), rng.choice(STREETS), city, state, rng.randint(10000, 99999)),
+        '%s.%s@example.com (%03d) %03d-%04d' % (name.split()[0].lower(), name.split()[1].lower(),
+                                               rng.randint(200, 999), rng.randint(200, 999),
+                                               rng.randint(0, 9999)),
+    ]
+
+    if rng.random() < 0.6:
+        lines += [rng.choice(HEADINGS['objective']),
+                  'Seeking a position where I can apply my experience in ' + rng.choice(TITLES).lower() + '.']
+
+    lines.append(rng.choice(HEADINGS['education']))
+    for _ in range(rng.randint(1, 3)):
+        lines += [rng.choice(vocabulary['universities']) + ', ' + rng.choice(CITIES)[0],
+                  rng.choice(DEGREES) + '  ' + _period(rng)]
+
+    lines.append(rng.choice(HEADINGS['experience']))
+    jobs = max(1, body_lines // 12)
+    for _ in range(jobs):
+        lines += [rng.choice(vocabulary['companies']), rng.choice(TITLES) + '  ' + _period(rng)]
+        lines += rng.sample(DUTIES, rng.randint(1, len(DUTIES)))
+
+    lines.append(rng.choice(HEADINGS['skills']))
+    for _ in range(max(1, body_lines // 20)):
+        lines.append(', '.join(rng.sample(vocabulary['skills'], 6)))
+
+    # Whatever is left of the length budget goes to publications, the long tail
+    remaining = body_lines - (len(lines) - 3)
+    if remaining > 0:
+        lines.append(rng.choice(HEADINGS['publications']))
+        for i in range(remaining):
+            lines.append('%s, %s. On the %s of %s. Journal of %s %d, %d-%d.' % (
+                rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES)[0], rng.choice(['analysis', 'synthesis', 'design']),
+                rng.choice(vocabulary['skills']), rng.choice(['Science', 'Computing', 'Chemistry']),
+                rng.randint(1995, 2017), i, i + 12))
+
+    return lines
+
+
+def _pdf_string(text):
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def write_pdf(path, lines, lines_per_page=55):
+    """
+    Writes lines as a text PDF with one Helvetica font and a page per
+    lines_per_page lines.
+    """
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    kids = []
+    for page in pages:
+        content = 'BT /F1 10 Tf 13 TL 50 750 Td ' + ' '.join(_pdf_string(line) + " '" for line in page) + ' ET'
+        content = content.encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        objects.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        kids.append('%d 0 R' % len(objects))
+    objects[1] = '<< /Type /Pages /Kids [%s] /Count %d >>' % (' '.join(kids), len(kids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        if isinstance(obj, str):
+            obj = obj.encode('latin-1')
+        out += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as pdf:
+        pdf.write(out)
+
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>')
+
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>')
+
+
+def write_docx(path, lines):
+    """
+    Writes lines as the paragraphs of a minimal DOCX package.
+    """
+    paragraphs = ''.join('<w:p><w:r><w:t xml:space="preserve">%s</w:t></w:r></w:p>' % escape(line)
+                         for line in lines)
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                '<w:body>%s</w:body></w:document>' % paragraphs)
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        docx.writestr('_rels/.rels', DOCX_RELS)
+        docx.writestr('word/document.xml', document)
+
+
+def build_corpus(directory, count, db_path='respars.sqlite3', docx_ratio=0.3,
+                 median_lines=60, sigma=0.8, max_lines=4000, seed=0):
+    """
+    Writes count synthetic resumes to directory.
+    :param median_lines: Median number of body lines
+    :param sigma: Log-normal shape, larger values give a longer tail of long CVs
+    :return: List of the paths written
+    """
+    rng = random.Random(seed)
+    vocabulary = load_vocabulary(db_path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    paths = []
+    for i in range(count):
+        body_lines = min(max_lines, int(rng.lognormvariate(math.log(median_lines), sigma)))
+        lines = make_resume(rng, vocabulary, body_lines)
+        if rng.random() < docx_ratio:
+            path = os.path.join(directory, 'resume_%05d.docx' % i)
+            write_docx(path, lines)
+        else:
+            path = os.path.join(directory, 'resume_%05d.pdf' % i)
+            write_pdf(path, lines)
+        paths.append(path)
+
+    return paths
+
+
+def add_arguments(parser):
+    parser.add_argument('--count', type=int, default=100, help='number of resumes')
+    parser.add_argument('--docx-ratio', type=float, default=0.3, help='share of DOCX files')
+    parser.add_argument('--median-lines', type=int, default=60, help='median body length in lines')
+    parser.add_argument('--sigma', type=float, default=0.8, help='log-normal shape of the body length')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default='respars.sqlite3')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('directory')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    paths = build_corpus(args.directory, args.count, args.db, args.docx_ratio,
+                         args.median_lines, args.sigma, seed=args.seed)
+    print('Wrote %d resumes to %s' % (len(paths), args.directory))
+
+
+if __name__ == '__main__':
+    main()
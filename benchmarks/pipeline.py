@@ -0,0 +1,193 @@
+"""
+End to end benchmark of cvparser.process over a synthetic resume corpus.
+
+Every pipeline stage is timed through the extractor registry and reported with
+p50/p95/p99 latencies next to the overall throughput. Lookups run against an
+in-process stand-in for Elasticsearch, so no cluster is needed and the numbers
+are reproducible. Save a baseline and compare later runs against it:
+
+    python -m benchmarks.pipeline --count 200 --save benchmarks/baselines/local.json
+    python -m benchmarks.pipeline --count 200 --compare benchmarks/baselines/local.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from resumeparser.utils import cvparser, resources
+
+from . import corpus
+from .timing import summarize, timed
+
+
+class LocalElasticsearch(object):
+    """
+    Answers the msearch requests of cvparser._search_lines from the local
+    gazetteers, in the shape of an Elasticsearch 5 response.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.queries = 0
+
+    def msearch(self, body, index, doc_type=None, filter_path=None):
+        gazetteer = resources.get('gazetteer:' + index)
+        responses = []
+        for query in body[1::2]:
+            self.queries += 1
+            hits = gazetteer.search(query['query']['match']['name'], self.size)
+            responses.append({'hits': {'total': len(hits),
+                                       'hits': [{'_source': {'name': name}} for name, score in hits]}})
+
+        return {'responses': responses}
+
+
+def run(paths, fields=None):
+    """
+    Parses every file once and times the whole parse and each stage.
+    :param paths: Resume paths
+    :param fields: Names of the fields to extract, all by default
+    :return: Report dictionary
+    """
+    timings = {}
+    registered = cvparser.extractors.copy()
+    for name, (extract, requires) in registered.items():
+        cvparser.extractors[name] = (timed(name, extract, timings), requires)
+
+    total_bytes = 0
+    errors = {}
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            total_bytes += os.path.getsize(path)
+            file_start = time.perf_counter()
+            try:
+                with open(path, 'rb') as resume_file:
+                    cvparser.process(resume_file, fields)
+            except Exception as e:
+                errors[os.path.basename(path)] = str(e)
+                continue
+            timings.setdefault('process', []).append(time.perf_counter() - file_start)
+    finally:
+        cvparser.extractors.update(registered)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'files': len(paths),
+        'errors': errors,
+        'elapsed': elapsed,
+        'files_per_second': len(paths) / elapsed if elapsed else 0.0,
+        'mb_per_second': total_bytes / 1e6 / elapsed if elapsed else 0.0,
+        'stages': {name: summarize(values) for name, values in timings.items()},
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    :param tolerance: Allowed relative slowdown, e.g. 0.2 for 20%
+    :return: List of regression messages
+    """
+    regressions = []
+    for name, stats in sorted(report['stages'].items()):
+        previous = baseline['stages'].get(name)
+        if not previous:
+            continue
+
+        for key in ('p50', 'p95'):
+            if previous[key] and stats[key] > previous[key] * (1 + tolerance):
+                regressions.append('%s %s: %.2fms -> %.2fms (+%.0f%%)' % (
+                    name, key, previous[key] * 1000, stats[key] * 1000,
+                    (stats[key] / previous[key] - 1) * 100))
+
+    if report['files_per_second'] < baseline['files_per_second'] * (1 - tolerance):
+        regressions.append('throughput: %.2f -> %.2f files/s' % (
+            baseline['files_per_second'], report['files_per_second']))
+
+    return regressions
+
+
+def print_report(report):
+    print('%d files in %.2fs: %.2f files/s, %.2f MB/s, %d errors' % (
+        report['files'], report['elapsed'], report['files_per_second'],
+        report['mb_per_second'], len(report['errors'])))
+    print('%-14s %8s %10s %10s %10s %10s' % ('stage', 'count', 'mean ms', 'p50 ms', 'p95 ms', 'p99 ms'))
+
+    names = ['process'] + [name for name in cvparser.extractors if name in report['stages']]
+    for name in names:
+        stats = report['stages'].get(name)
+        if stats:
+            print('%-14s %8d %10.2f %10.2f %10.2f %10.2f' % (
+                name, stats['count'], stats['mean'] * 1000, stats['p50'] * 1000,
+                stats['p95'] * 1000, stats['p99'] * 1000))
+
+    for name, error in sorted(report['errors'].items())[:10]:
+        print('error %s: %s' % (name, error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='directory of resumes to parse instead of a generated corpus')
+    corpus.add_arguments(parser)
+    parser.add_argument('--fields', help='comma separated fields to extract, all by default')
+    parser.add_argument('--lookup', choices=('stand-in', 'local'), default='stand-in',
+                        help='answer lookups through the Elasticsearch code path or the local gazetteer')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    if args.lookup == 'local':
+        cvparser.LOOKUP_BACKEND = 'local'
+    else:
+        cvparser.LOOKUP_BACKEND = 'elasticsearch'
+        cvparser.es_client = LocalElasticsearch()
+
+    fields = args.fields.split(',') if args.fields else None
+    resources.warm()
+    for index in cvparser.lookup_indices:
+        resources.get('gazetteer:' + index)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.corpus:
+            paths = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+                           if name.lower().endswith(('.pdf', '.docx')))
+        else:
+            paths = corpus.build_corpus(directory, args.count, args.db, args.docx_ratio,
+                                        args.median_lines, args.sigma, seed=args.seed)
+
+        # One untimed parse so lazy imports and caches do not skew the first sample
+        run(paths[:1], fields)
+        report = run(paths, fields)
+
+    report['config'] = {
+        'corpus': args.corpus, 'count': args.count, 'docx_ratio': args.docx_ratio,
+        'median_lines': args.median_lines, 'sigma': args.sigma, 'seed': args.seed,
+        'fields': fields, 'lookup': args.lookup,
+        'python': platform.python_version(), 'machine': platform.machine(),
+    }
+    print_report(report)
+
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(args.save, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        print('Saved %s' % args.save)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions beyond %.0f%%' % (args.tolerance * 100))
+
+
+if __name__ == '__main__':
+    main()
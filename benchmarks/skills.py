@@ -0,0 +1,76 @@
+"""
+Compare the skill trie against the original extract_skills loop.
+
+Both sides share the same regex tokenizer so only the matching is measured.
+Run from the repository root:
+
+    python -m benchmarks.skills --lines 2000
+"""
+import argparse
+import random
+import re
+import sqlite3
+import time
+
+from resumeparser.utils.skillmatcher import build_skill_matcher
+
+from .timing import best_of
+
+token_pattern = re.compile(r"[\w+#.]+")
+
+
+def tokenize(text):
+    return [token.lower() for token in token_pattern.findall(text)]
+
+
+def legacy_extract_skills(lines, skills_list):
+    found_skills = []
+    for line in lines:
+        processed_text = tokenize(line)
+        found_skills += [s for s in skills_list if s.lower() in processed_text and s not in found_skills]
+
+    return list(set(found_skills))
+
+
+def make_skills_section(skills_list, num_lines, seed=0):
+    rng = random.Random(seed)
+    filler = ['experienced', 'with', 'using', 'and', 'strong', 'knowledge', 'of', 'tools']
+    lines = []
+    for _ in range(num_lines):
+        words = rng.sample(skills_list, 6) + rng.sample(filler, 4)
+        rng.shuffle(words)
+        lines.append(', '.join(words))
+
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=500, help='lines in the synthetic skills section')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--db', default='respars.sqlite3')
+    parser.add_argument('--dump', default='elasticsearch-dump/skillsets.json.gz')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    skills_list = [s[0] for s in conn.execute("SELECT name FROM skills")]
+    conn.close()
+
+    lines = make_skills_section(skills_list, args.lines)
+
+    start = time.perf_counter()
+    matcher = build_skill_matcher(tokenize, args.db, args.dump)
+    build_time = time.perf_counter() - start
+
+    legacy_time = best_of(lambda: legacy_extract_skills(lines, skills_list), args.repeat)
+    trie_time = best_of(lambda: matcher.count(lines), args.repeat)
+
+    print('skills section: %d lines, dictionary: %d phrases' % (len(lines), len(matcher)))
+    print('trie build:     %8.2f ms (once per process)' % (build_time * 1000))
+    print('legacy loop:    %8.2f ms' % (legacy_time * 1000))
+    print('skill trie:     %8.2f ms' % (trie_time * 1000))
+    print('speedup:        %8.1fx' % (legacy_time / trie_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Timing helpers shared by the benchmark scripts.
+"""
+import time
+
+
+def best_of(func, repeat):
+    """
+    Runs func repeat times and keeps the fastest run, which is the least
+    disturbed by other work on the machine.
+    :param func: Callable without arguments
+    :param repeat: Number of runs
+    :return: Seconds taken by the fastest run
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def percentile(timings, percent):
+    """
+    Nearest rank percentile of a sorted list.
+    """
+    if not timings:
+        return 0.0
+
+    rank = max(1, int(round(percent / 100.0 * len(timings))))
+    return timings[min(rank, len(timings)) - 1]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'count': len(timings),
+        'mean': sum(timings) / len(timings) if timings else 0.0,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+    }
+
+
+def timed(name, func, timings):
+    """
+    Wraps a one argument callable so every call is timed.
+    :param name: Key the durations are appended under
+    :param func: Callable to time
+    :param timings: Dictionary of name to list of durations in seconds
+    :return: Wrapped callable
+    """
+    def wrapper(arg):
+        start = time.perf_counter()
+        try:
+            return func(arg)
+        finally:
+            timings.setdefault(name, []).append(time.perf_counter() - start)
+
+    return wrapper
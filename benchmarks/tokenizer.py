@@ -0,0 +1,57 @@
+"""
+Compare the regex tokenizer against NLTK's word_tokenize on resume lines.
+
+Lines come from the synthetic corpus generator. Run from the repository root:
+
+    python -m benchmarks.tokenizer --resumes 200
+"""
+import argparse
+import random
+from functools import partial
+
+from resumeparser.utils.tokenizer import regex_tokenize
+
+from . import corpus
+from .timing import best_of
+
+
+def tokenize_lines(tokenize, lines):
+    for line in lines:
+        tokenize(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--resumes', type=int, default=100, help='synthetic resumes the lines are taken from')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default='respars.sqlite3')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = corpus.load_vocabulary(args.db)
+    lines = []
+    for _ in range(args.resumes):
+        lines += corpus.make_resume(rng, vocabulary, rng.randint(20, 120))
+
+    from nltk.tokenize import word_tokenize
+    try:
+        word_tokenize('Warm up.')
+        nltk_name = 'word_tokenize'
+    except LookupError:
+        # Without the Punkt model only the Treebank step can run, which understates the gap
+        def word_tokenize(text):
+            from nltk.tokenize import word_tokenize as nltk_word_tokenize
+            return nltk_word_tokenize(text, preserve_line=True)
+        nltk_name = 'word_tokenize(preserve_line=True), Punkt data missing'
+
+    nltk_time = best_of(partial(tokenize_lines, word_tokenize, lines), args.repeat)
+    regex_time = best_of(partial(tokenize_lines, regex_tokenize, lines), args.repeat)
+
+    print('%d lines' % len(lines))
+    print('nltk:  %.3fs  %s' % (nltk_time, nltk_name))
+    print('regex: %.3fs  %.1fx faster' % (regex_time, nltk_time / regex_time if regex_time else 0))
+
+
+if __name__ == '__main__':
+    main()
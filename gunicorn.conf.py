@@ -0,0 +1,24 @@
+# gunicorn -c gunicorn.conf.py resumeparser.wsgi
+#
+# preload_app imports resumeparser.wsgi, which warms the parser resources, in
+# the master before the workers are forked, so all workers share one copy.
+#
+# Every worker writes its metrics to a file in RESUMEPARSER_METRICS_DIR and
+# /metrics adds them up, the directory is emptied when the server starts.
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+metrics_dir = os.environ.setdefault('RESUMEPARSER_METRICS_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'resumeparser-metrics'))
+
+bind = '0.0.0.0:8000'
+preload_app = True
+workers = multiprocessing.cpu_count() * 2 + 1
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from resumeparser.utils import cvparser, metrics
+from resumeparser.utils.sandbox import ExtractionError, SandboxPool
+
+from .cache import parse_cache
+
+# Created on first use so that forked web workers each get their own pools
+pool = None
+executor = None
+
+
+def _get_pool():
+    """
+    :return: SandboxPool the resumes are parsed in. Its workers are daemonic, so
+             they extract text themselves instead of starting extraction workers,
+             and the whole parse runs under the limits of the pool.
+    """
+    global pool
+    if pool is None:
+        pool = SandboxPool(settings.PARSE_BATCH_WORKERS, timeout=settings.PARSE_BATCH_TIMEOUT,
+                           max_memory=cvparser.EXTRACT_MAX_MEMORY * 1024 * 1024,
+                           max_tasks=cvparser.EXTRACT_MAX_TASKS)
+
+    return pool
+
+
+def _get_executor():
+    # One thread waits on each parse running in the pool, so results are taken as they finish
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=settings.PARSE_BATCH_WORKERS)
+
+    return executor
+
+
+def _parse_in_pool(data, fields):
+    return _get_pool().run(parse_bytes, data, fields)
+
+
+def parse_bytes(data, fields=None):
+    """
+    Parses one resume in a pool worker.
+    :param data: File contents, its leading bytes select the converter
+    :param fields: Names of the fields to extract, all by default
+    :return: resume_data: Parsed resume dictionary, or None for unsupported files
+    """
+    try:
+        return cvparser.process(data, fields)
+    finally:
+        # Pool workers exit without atexit handlers when they are replaced
+        metrics.flush()
+
+
+def _is_archive(upload):
+    """
+    Tells zip archives from resumes by their contents, whatever their name. A docx
+    file is a zip archive too, see cvparser.file_type().
+    :param upload: Uploaded file, rewound afterwards
+    :return: True for a zip archive without word/document.xml
+    """
+    try:
+        if upload.read(4) != b'PK\x03\x04':
+            return False
+
+        upload.seek(0)
+        with zipfile.ZipFile(upload) as archive:
+            return 'word/document.xml' not in archive.namelist()
+    except zipfile.BadZipfile:
+        # Reported as an invalid zip file
+        return True
+    finally:
+        upload.seek(0)
+
+
+def iter_uploads(files):
+    """
+    Expands uploaded files and zip archives into individual resumes.
+    :param files: List of uploaded files
+    :return: Generator of (name, data, error) tuples, data is None when error is set
+    """
+    for upload in files:
+        if not _is_archive(upload):
+            if upload.size > settings.PARSE_BATCH_MAX_FILE_SIZE:
+                yield upload.name, None, 'File too large'
+            else:
+                yield upload.name, upload.read(), None
+            continue
+
+        try:
+            with zipfile.ZipFile(upload) as archive:
+                for info in archive.infolist():
+                    if info.filename.endswith('/'):
+                        continue
+
+                    if info.file_size > settings.PARSE_BATCH_MAX_FILE_SIZE:
+                        yield info.filename, None, 'File too large'
+                    else:
+                        yield info.filename, archive.read(info), None
+        except zipfile.BadZipfile as e:
+            yield upload.name, None, 'Invalid zip file: ' + str(e)
+
+
+def _record(name, resume_data=None, error=None, code=None):
+    if error is None and resume_data is None:
+        error = 'Unsupported file type'
+
+    if error is not None:
+        record = {'filename': name, 'status': 'error', 'error': error}
+        if code is not None:
+            record['code'] = code
+    else:
+        record = {'filename': name, 'status': 'ok', 'data': resume_data}
+
+    return json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def parse_many(files, fields=None):
+    """
+    Fans resumes out across the worker pool. A file is read when a worker is
+    about to be free, at most two per worker are held in memory at a time. The
+    uploads stay open until the streamed response is closed.
+    :param files: List of uploaded files
+    :param fields: Names of the fields to extract, all by default
+    :return: Generator of NDJSON lines, one per resume, in completion order
+    """
+    window = settings.PARSE_BATCH_WORKERS * 2
+    # Future -> (name, cache key)
+    futures = {}
+
+    for name, data, error in iter_uploads(files):
+        if error is not None:
+            yield _record(name, error=error)
+        elif cvparser.file_type(data) is None:
+            yield _record(name)
+        else:
+            digest = hashlib.sha256(data).hexdigest()
+            resume_data = parse_cache.get(digest)
+            if resume_data is not None:
+                yield _record(name, cvparser.select_fields(resume_data, fields or cvparser.DEFAULT_FIELDS))
+                continue
+
+            # Only full parses are cached
+            cache_key = None if fields else digest
+            futures[_get_executor().submit(_parse_in_pool, data, fields or cvparser.STORED_FIELDS)] = \
+                (name, cache_key)
+            if len(futures) >= window:
+                for line in _finished(futures):
+                    yield line
+
+    while futures:
+        for line in _finished(futures):
+            yield line
+
+
+def _finished(futures):
+    """
+    Waits for at least one parse to finish and removes the finished ones from futures.
+    :return: Generator of the NDJSON lines of the finished parses
+    """
+    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+    for future in done:
+        name, cache_key = futures.pop(future)
+        try:
+            resume_data = future.result()
+            if resume_data is not None and cache_key is not None:
+                parse_cache.set(cache_key, resume_data)
+                resume_data = cvparser.select_fields(resume_data, cvparser.DEFAULT_FIELDS)
+            yield _record(name, resume_data)
+        except ExtractionError as e:
+            # The parse broke a limit of the pool or its worker died, e.g. killed by the OOM killer
+            yield _record(name, error=str(e), code=e.code)
+        except Exception as e:
+            logging.error('Issue parsing %s in batch:: %s' % (name, e))
+            yield _record(name, error=str(e))
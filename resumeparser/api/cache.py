@@ -0,0 +1,162 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+
+from resumeparser.utils import cvparser
+from resumeparser.utils.buffers import map_file
+
+from .models import ParsedResult
+
+
+def file_hash(upload):
+    """
+    SHA-256 of an uploaded file, computed by the hashing upload handlers or,
+    failing that, over the mapped file.
+    :param upload: Uploaded or stored file
+    :return: Hex digest
+    """
+    digest = getattr(upload, 'sha256', None)
+    if digest:
+        return digest
+
+    with map_file(upload) as buffer:
+        upload.sha256 = hashlib.sha256(buffer.data).hexdigest()
+
+    return upload.sha256
+
+
+class ParseCache(object):
+    """
+    Two tier cache of parse results keyed by file hash and parser version: an
+    in-process LRU in front of the ParsedResult table. Results are kept as JSON
+    text so every caller gets its own copy to modify.
+    Nothing is cached while the parser version is not known, see parser_version().
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, digest):
+        """
+        :param digest: File hash
+        :return: resume_data: Cached parse result, or None
+        """
+        key = (digest, cvparser.parser_version())
+        if key[1] is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(result)
+
+        cached = ParsedResult.objects.filter(file_hash=key[0], version=key[1]).values_list('result', flat=True)
+        result = cached.first()
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+
+            self.db_hits += 1
+            self._remember(key, result)
+        return json.loads(result)
+
+    def set(self, digest, resume_data):
+        """
+        :param digest: File hash
+        :param resume_data: Parse result to cache
+        """
+        key = (digest, cvparser.parser_version())
+        if key[1] is None:
+            return
+
+        result = json.dumps(resume_data, cls=DjangoJSONEncoder)
+
+        try:
+            ParsedResult.objects.create(file_hash=key[0], version=key[1], result=result)
+        except IntegrityError:
+            # Another worker parsed the same file concurrently
+            pass
+
+        with self._lock:
+            self._remember(key, result)
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, everything=False):
+        """
+        Drops entries of other parser versions, or all entries.
+        :param everything: Also drop entries of the current version
+        :return: Number of rows deleted from the persistent tier
+        """
+        with self._lock:
+            self._entries.clear()
+
+        stale = ParsedResult.objects.all()
+        if not everything:
+            version = cvparser.parser_version()
+            if version is None:
+                # The current entries cannot be told apart from stale ones
+                return 0
+            stale = stale.exclude(version=version)
+        return stale.delete()[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                'version': cvparser.parser_version(),
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_rate': float(self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+
+parse_cache = ParseCache(settings.PARSE_CACHE_SIZE)
+
+
+def process(upload, digest=None, fields=None):
+    """
+    cvparser.process with results cached by file content. Only full parses are
+    cached, requests for some fields are served from them when available.
+    :param upload: Uploaded or stored resume file
+    :param digest: File hash if already known
+    :param fields: Names of the fields to extract, all of cvparser.STORED_FIELDS by default
+    :return: resume_data: Parsed resume dictionary
+    """
+    if digest is None:
+        digest = file_hash(upload)
+
+    resume_data = parse_cache.get(digest)
+    if resume_data is not None and fields:
+        resume_data = cvparser.select_fields(resume_data, fields)
+    elif fields:
+        resume_data = cvparser.process(upload, fields)
+    elif resume_data is None:
+        resume_data = cvparser.process(upload, cvparser.STORED_FIELDS)
+        if resume_data is not None:
+            parse_cache.set(digest, resume_data)
+            resume_data = json.loads(json.dumps(resume_data, cls=DjangoJSONEncoder))
+
+    return resume_data
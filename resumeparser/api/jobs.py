@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from resumeparser.utils import cvparser
+
+from . import cache, persist
+from .models import ParseJob
+
+# Created on first use so that forked web workers each get their own threads
+executor = None
+
+
+def _get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=settings.PARSE_JOB_WORKERS)
+
+    return executor
+
+
+def enqueue(archive):
+    """
+    Queues a parse job for an uploaded resume.
+    :param archive: Saved ResumeArchive
+    :return: job: The queued ParseJob
+    """
+    job = ParseJob.objects.create(archive=archive)
+
+    if settings.PARSE_JOBS_IN_PROCESS:
+        transaction.on_commit(lambda: _get_executor().submit(run_pending))
+
+    return job
+
+
+def claim_job():
+    """
+    Moves the oldest queued job to running and leases it. The conditional UPDATE
+    makes the claim atomic, so any number of threads and processes can share the queue.
+    :return: job: The claimed ParseJob, or None if the queue is empty
+    """
+    while True:
+        job_ids = list(ParseJob.objects.filter(status=ParseJob.QUEUED)
+                       .order_by('id').values_list('id', flat=True)[:10])
+        if not job_ids:
+            return None
+
+        for job_id in job_ids:
+            if ParseJob.objects.filter(id=job_id, status=ParseJob.QUEUED).update(
+                    status=ParseJob.RUNNING, claimed_at=timezone.now(), attempts=F('attempts') + 1):
+                return ParseJob.objects.select_related('archive').get(id=job_id)
+
+
+def requeue_expired():
+    """
+    Queues running jobs whose lease expired again, the process running them is
+    gone. Jobs abandoned PARSE_JOB_MAX_ATTEMPTS times fail instead, since they
+    may be what stops their workers.
+    :return: Number of jobs queued again
+    """
+    now = timezone.now()
+    expired = ParseJob.objects.filter(status=ParseJob.RUNNING,
+                                      claimed_at__lt=now - timedelta(seconds=settings.PARSE_JOB_LEASE))
+    expired.filter(attempts__gte=settings.PARSE_JOB_MAX_ATTEMPTS).update(
+        status=ParseJob.FAILED, error='The job was abandoned by its worker too many times', updated=now)
+
+    return expired.update(status=ParseJob.QUEUED, claimed_at=None, updated=now)
+
+
+def renew_lease(job):
+    """
+    Extends the lease of a job this process runs.
+    :param job: Claimed ParseJob, its claimed_at is moved to now
+    :return: False if the lease expired and the job may run elsewhere
+    """
+    now = timezone.now()
+    if not ParseJob.objects.filter(id=job.id, status=ParseJob.RUNNING, claimed_at=job.claimed_at).update(
+            claimed_at=now):
+        return False
+
+    job.claimed_at = now
+    return True
+
+
+def _keep_lease(job, done):
+    """
+    Renews the lease of a job three times per PARSE_JOB_LEASE until done is set,
+    so that a slow parse is not run a second time.
+    """
+    try:
+        while not done.wait(settings.PARSE_JOB_LEASE / 3):
+            if not renew_lease(job):
+                return
+    finally:
+        connection.close()
+
+
+def run_job(job):
+    """
+    Parses the archived resume of a claimed job and stores the outcome. The lease
+    is renewed while the parse runs.
+    :param job: ParseJob in running state
+    """
+    done = threading.Event()
+    keeper = threading.Thread(target=_keep_lease, args=(job, done), daemon=True)
+    keeper.start()
+    try:
+        _parse_job(job)
+    finally:
+        done.set()
+        keeper.join()
+
+    # Only while the lease is ours, after it expired the job may run elsewhere
+    saved = ParseJob.objects.filter(id=job.id, status=ParseJob.RUNNING, claimed_at=job.claimed_at).update(
+        result=job.result, error=job.error, status=job.status, updated=timezone.now())
+    if not saved:
+        logging.error('Issue saving parse job %s:: its lease expired' % job.id)
+
+
+def _parse_job(job):
+    """
+    Sets the result or the error and the final status of a job.
+    """
+    try:
+        datafile = job.archive.datafile
+        datafile.open('rb')
+        try:
+            resume_data = cache.process(datafile)
+        finally:
+            datafile.close()
+
+        if resume_data:
+            persist.save_resume(job.archive, resume_data)
+            resume_data = cvparser.select_fields(resume_data, cvparser.DEFAULT_FIELDS)
+
+        job.result = json.dumps(resume_data, cls=DjangoJSONEncoder)
+        job.status = ParseJob.DONE
+    except Exception as e:
+        logging.error('Issue running parse job %s:: %s' % (job.id, e))
+        job.error = str(e)
+        job.status = ParseJob.FAILED
+
+
+def run_pending():
+    """
+    Runs queued jobs until the queue is empty.
+    :return: Number of jobs run
+    """
+    count = 0
+    try:
+        requeue_expired()
+        job = claim_job()
+        while job is not None:
+            run_job(job)
+            count += 1
+            job = claim_job()
+    finally:
+        close_old_connections()
+
+    return count
@@ -0,0 +1,18 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from resumeparser.utils import cvparser
+
+
+class Command(BaseCommand):
+    help = 'Compiles the parser dictionaries into the memory mapped artifact shared by worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Artifact file, RESUMEPARSER_ARTIFACT or respars.artifact by default.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        path = cvparser.build_artifact(options['output'])
+        self.stdout.write('Wrote %s (%.1f MB) in %.1fs' % (path, os.path.getsize(path) / 1e6, time.time() - start))
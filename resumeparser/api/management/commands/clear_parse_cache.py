@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from resumeparser.api.cache import parse_cache
+
+
+class Command(BaseCommand):
+    help = 'Deletes cached parse results of outdated parser or dictionary versions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Also delete results of the current version.')
+
+    def handle(self, *args, **options):
+        deleted = parse_cache.invalidate(everything=options['all'])
+        self.stdout.write('Deleted %d cached parse results' % deleted)
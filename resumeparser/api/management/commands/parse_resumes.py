@@ -0,0 +1,239 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from resumeparser.utils import cvparser, resources
+from resumeparser.utils.sandbox import ExtractionError, SandboxPool
+
+RESUME_EXTENSIONS = ('.pdf', '.docx')
+
+RESULT_COLUMNS = ('file_path', 'name', 'edu', 'company', 'phone_number', 'area_code', 'email',
+                  'email_domain', 'street_address', 'state', 'zip_code', 'phd')
+
+
+def _parse_path(path):
+    try:
+        with open(path, 'rb') as resume_file:
+            return path, cvparser.process(resume_file), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _result_row(path, resume_data):
+    """
+    Flattens a parsed resume into a row of the results table.
+    """
+    contact_info = resume_data['contact_info']
+    contact_method = contact_info['contact_method']
+    phone = contact_method['telephone']
+    email = contact_method['email']
+    address = contact_method['address']
+
+    return (
+        path,
+        contact_info['person_name']['full_name'],
+        ', '.join(resume_data['education']),
+        ', '.join(w['organization'] for w in resume_data['work_history']),
+        phone,
+        phone.split('-')[0] if phone and phone.count('-') == 2 else None,
+        email,
+        email.split('@')[-1] if email else None,
+        address['street_address'],
+        address['state'],
+        address['zipcode'],
+        int('Ph.D.' in resume_data['degree']),
+    )
+
+
+def find_resumes(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(RESUME_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def parse_paths(pool, paths, window):
+    """
+    Parses files in a SandboxPool, keeping at most `window` of them queued.
+    :return: Generator of (path, resume_data, error) tuples, in completion order
+    """
+    paths = iter(paths)
+    running = {}
+    # One thread waits on each parse running in the pool
+    executor = ThreadPoolExecutor(max_workers=pool.workers)
+    try:
+        while True:
+            for path in paths:
+                running[executor.submit(pool.run, _parse_path, path)] = path
+                if len(running) >= window:
+                    break
+
+            if not running:
+                return
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = running.pop(future)
+                try:
+                    yield future.result()
+                except ExtractionError as e:
+                    # Timed out, ran out of memory or crashed its worker
+                    yield path, None, '%s: %s' % (e.code, e)
+    finally:
+        for future in running:
+            future.cancel()
+        executor.shutdown()
+
+
+class JsonLinesWriter(object):
+
+    def __init__(self, path):
+        self.path = path
+        # Bytes of complete records, see done()
+        self._size = None
+
+    def done(self):
+        """
+        :return: Paths of the recorded files. A last line without its newline,
+                 left by a killed run, is not a record and open() cuts it off.
+        """
+        if not os.path.exists(self.path):
+            return set()
+
+        done = set()
+        self._size = 0
+        with open(self.path, 'rb') as output:
+            for number, line in enumerate(output, 1):
+                if not line.endswith(b'\n'):
+                    break
+
+                if line.strip():
+                    try:
+                        done.add(json.loads(line.decode('utf-8'))['file_path'])
+                    except (ValueError, KeyError):
+                        raise CommandError('%s: line %d is not a result record' % (self.path, number))
+                self._size += len(line)
+
+        return done
+
+    def open(self):
+        self._output = open(self.path, 'a')
+        if self._size is not None:
+            self._output.truncate(self._size)
+
+    def write(self, path, resume_data, error):
+        record = {'file_path': path, 'data': resume_data, 'error': error}
+        self._output.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+
+    def flush(self):
+        self._output.flush()
+
+    def close(self):
+        self._output.close()
+
+
+class ResultsTableWriter(object):
+    """
+    Bulk inserts rows into the results table of respars.sqlite3. Files that
+    fail to parse are not recorded, so they are retried on the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._rows = []
+
+    def done(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return {row[0] for row in conn.execute("SELECT file_path FROM results")}
+        finally:
+            conn.close()
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path)
+
+    def write(self, path, resume_data, error):
+        if resume_data:
+            self._rows.append(_result_row(path, resume_data))
+
+    def flush(self):
+        sql = "INSERT INTO results (%s) VALUES (%s)" % (
+            ', '.join(RESULT_COLUMNS), ', '.join('?' * len(RESULT_COLUMNS)))
+        with self._conn:
+            self._conn.executemany(sql, self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+class Command(BaseCommand):
+    help = 'Parses every PDF and DOCX resume below a directory using all cores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        output = parser.add_mutually_exclusive_group()
+        output.add_argument('--output', help='JSON lines file results are appended to.')
+        output.add_argument('--database', help='SQLite database whose results table rows are inserted into.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of parser processes.')
+        parser.add_argument('--timeout', type=float, default=settings.PARSE_BATCH_TIMEOUT,
+                            help='Seconds a file may take before its parser process is killed.')
+        parser.add_argument('--flush-every', type=int, default=100,
+                            help='Number of results written between commits and progress reports.')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['directory']):
+            raise CommandError('%s is not a directory' % options['directory'])
+
+        if options['output']:
+            writer = JsonLinesWriter(options['output'])
+        elif options['database']:
+            writer = ResultsTableWriter(options['database'])
+        else:
+            raise CommandError('One of --output or --database is required')
+
+        done = writer.done()
+        paths = [p for p in find_resumes(options['directory']) if p not in done]
+        self.stdout.write('%d resumes to parse, %d already parsed' % (len(paths), len(done)))
+        if not paths:
+            return
+
+        # Load parser resources before forking so the pool processes share them
+        resources.warm()
+
+        # Workers are daemonic and extract text themselves, under the limits of the pool
+        pool = SandboxPool(options['workers'], timeout=options['timeout'],
+                           max_memory=cvparser.EXTRACT_MAX_MEMORY * 1024 * 1024,
+                           max_tasks=cvparser.EXTRACT_MAX_TASKS)
+
+        writer.open()
+        start = time.time()
+        parsed = failed = 0
+        try:
+            for path, resume_data, error in parse_paths(pool, paths, options['workers'] * 2):
+                writer.write(path, resume_data, error)
+                parsed += 1
+                if error or not resume_data:
+                    failed += 1
+
+                if parsed % options['flush_every'] == 0:
+                    writer.flush()
+                    self._report(parsed, failed, len(paths), start)
+        finally:
+            writer.close()
+
+        self._report(parsed, failed, len(paths), start)
+
+    def _report(self, parsed, failed, total, start):
+        elapsed = time.time() - start
+        self.stdout.write('%d/%d parsed (%d failed) in %.1fs, %.1f files/s' % (
+            parsed, total, failed, elapsed, parsed / elapsed if elapsed else 0))
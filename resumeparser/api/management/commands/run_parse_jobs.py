@@ -0,0 +1,31 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from resumeparser.api import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued resume parse jobs outside the web process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of jobs run concurrently.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds to wait between polls of an empty queue.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                count = sum(pool.map(lambda _: jobs.run_pending(), range(workers)))
+                if count:
+                    self.stdout.write('Ran %d parse jobs' % count)
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
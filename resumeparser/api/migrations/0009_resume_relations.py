@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 12:54
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_parsedresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Degree',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Education',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('university', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization', models.CharField(max_length=255)),
+                ('start_date', models.DateField(null=True)),
+                ('end_date', models.DateField(null=True)),
+                ('current', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.RemoveField(
+            model_name='resume',
+            name='degree',
+        ),
+        migrations.RemoveField(
+            model_name='resume',
+            name='education',
+        ),
+        migrations.RemoveField(
+            model_name='resume',
+            name='work_history',
+        ),
+        migrations.AlterField(
+            model_name='resume',
+            name='email',
+            field=models.CharField(db_index=True, max_length=254),
+        ),
+        migrations.RemoveField(
+            model_name='resume',
+            name='skills',
+        ),
+        migrations.AlterField(
+            model_name='resume',
+            name='state',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='workhistory',
+            name='resume',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_history', to='api.Resume'),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='resume',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='education', to='api.Resume'),
+        ),
+        migrations.AddField(
+            model_name='degree',
+            name='resume',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='degrees', to='api.Resume'),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='skills',
+            field=models.ManyToManyField(related_name='resumes', to='api.Skill'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 13:06
+from __future__ import unicode_literals
+
+import logging
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+# Full text index of Resume.raw_text, kept in sync by triggers. SQLite rebuilds
+# a table for most schema changes and drops its triggers with it, so a later
+# migration that alters api_resume has to create them again.
+create_fulltext_sql = [
+    "CREATE VIRTUAL TABLE api_resume_fts USING fts5("
+    "raw_text, content='api_resume', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER api_resume_fts_insert AFTER INSERT ON api_resume BEGIN "
+    "INSERT INTO api_resume_fts(rowid, raw_text) VALUES (new.id, new.raw_text); END",
+    "CREATE TRIGGER api_resume_fts_delete AFTER DELETE ON api_resume BEGIN "
+    "INSERT INTO api_resume_fts(api_resume_fts, rowid, raw_text) VALUES ('delete', old.id, old.raw_text); END",
+    "CREATE TRIGGER api_resume_fts_update AFTER UPDATE OF raw_text ON api_resume BEGIN "
+    "INSERT INTO api_resume_fts(api_resume_fts, rowid, raw_text) VALUES ('delete', old.id, old.raw_text); "
+    "INSERT INTO api_resume_fts(rowid, raw_text) VALUES (new.id, new.raw_text); END",
+    "INSERT INTO api_resume_fts(api_resume_fts) VALUES ('rebuild')",
+]
+
+# Covers searches, which select the resume ids of a skill. The table of
+# Resume.skills is created by Django, so its index is not declared on a model.
+create_skill_index_sql = ["CREATE INDEX api_resume_skills_skill_resume ON api_resume_skills (skill_id, resume_id)"]
+
+drop_skill_index_sql = ["DROP INDEX api_resume_skills_skill_resume"]
+
+drop_fulltext_sql = [
+    "DROP TRIGGER IF EXISTS api_resume_fts_insert",
+    "DROP TRIGGER IF EXISTS api_resume_fts_delete",
+    "DROP TRIGGER IF EXISTS api_resume_fts_update",
+    "DROP TABLE IF EXISTS api_resume_fts",
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    # Other backends search raw_text without an index, see search.filter_resumes()
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    try:
+        for sql in create_fulltext_sql:
+            schema_editor.execute(sql)
+    except OperationalError as e:
+        # SQLite built without FTS5
+        logging.error('Issue creating the resume full text index:: ' + str(e))
+        for sql in drop_fulltext_sql:
+            schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in drop_fulltext_sql:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_resume_relations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='raw_text',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='resume',
+            name='zipcode',
+            field=models.CharField(db_index=True, max_length=11),
+        ),
+        migrations.AlterIndexTogether(
+            name='degree',
+            index_together=set([('name', 'resume')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='education',
+            index_together=set([('university', 'resume')]),
+        ),
+        migrations.RunSQL(create_skill_index_sql, drop_skill_index_sql),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
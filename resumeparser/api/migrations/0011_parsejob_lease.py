@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 13:23
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_resume_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsejob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='parsejob',
+            name='claimed_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
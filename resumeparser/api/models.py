@@ -10,21 +10,108 @@ class ResumeArchive(models.Model):
     datafile = models.FileField(upload_to='resumes/%Y/%m/%d', validators=[validator.validate_file_extension])
 
 
+class Skill(models.Model):
+
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 # Create your models here.
 class Resume(models.Model):
 
     name = models.CharField(max_length=70)
-    email = models.CharField(max_length=254)
+    email = models.CharField(max_length=254, db_index=True)
     phone_number = models.CharField(max_length=26)
     area_code = models.CharField(max_length=3)
     street_address = models.CharField(max_length=90)
-    state = models.CharField(max_length=20)
-    zipcode = models.CharField(max_length=11)
-    education = models.TextField()
-    degree = models.TextField(default='')
-    work_history = models.TextField()
-    skills = models.TextField(default='')
+    state = models.CharField(max_length=20, db_index=True)
+    zipcode = models.CharField(max_length=11, db_index=True)
+    skills = models.ManyToManyField(Skill, related_name='resumes')
+    raw_text = models.TextField(default='')
     file_id = models.ForeignKey(ResumeArchive, default='null')
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class Education(models.Model):
+    """ A university found in a resume. """
+
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='education')
+    university = models.CharField(max_length=255)
+
+    class Meta:
+        # Covers searches, which select the resume ids of a university
+        index_together = ('university', 'resume')
+
+    def __str__(self):
+        return self.university
+
+
+class Degree(models.Model):
+
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='degrees')
+    name = models.CharField(max_length=20)
+
+    class Meta:
+        index_together = ('name', 'resume')
+
+    def __str__(self):
+        return self.name
+
+
+class WorkHistory(models.Model):
+    """ A position, end_date is empty when unknown and current is set for an open end. """
+
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='work_history')
+    organization = models.CharField(max_length=255)
+    start_date = models.DateField(null=True)
+    end_date = models.DateField(null=True)
+    current = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return self.organization
+
+
+class ParseJob(models.Model):
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    archive = models.ForeignKey(ResumeArchive, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    result = models.TextField(default='')
+    error = models.TextField(default='')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    # Start of the lease of the worker running the job, and the number of times it was claimed
+    claimed_at = models.DateTimeField(null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return '%s (%s)' % (self.archive_id, self.status)
+
+
+class ParsedResult(models.Model):
+    """ Parse output cached by the SHA-256 of the uploaded file. """
+
+    file_hash = models.CharField(max_length=64)
+    version = models.CharField(max_length=40)
+    result = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('file_hash', 'version')
\ No newline at end of file
@@ -0,0 +1,150 @@
+import datetime
+import re
+
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Degree, Education, Resume, Skill, WorkHistory
+
+# Names per query, below the SQLite limit of 999 parameters
+LOOKUP_BATCH_SIZE = 500
+
+non_digit_pattern = re.compile(r'\D')
+
+
+def _truncate(value, model, field_name):
+    """
+    :return: value cut to the length of the column, '' for None
+    """
+    max_length = model._meta.get_field(field_name).max_length
+    return (value or '')[:max_length]
+
+
+def _to_date(value):
+    """
+    :param value: datetime from the parser, or its ISO format from a cached result
+    :return: date, or None
+    """
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+
+    return value
+
+
+def _resume_fields(contact_info):
+    """
+    :param contact_info: contact_info of a parse result
+    :return: Dictionary of Resume column values
+    """
+    contact_method = contact_info['contact_method']
+    address = contact_method['address']
+    phone_number = contact_method.get('telephone') or ''
+    digits = non_digit_pattern.sub('', phone_number)
+
+    return {
+        'name': _truncate(contact_info['person_name'].get('full_name'), Resume, 'name'),
+        'email': _truncate(contact_method.get('email'), Resume, 'email'),
+        'phone_number': _truncate(phone_number, Resume, 'phone_number'),
+        'area_code': digits[-10:-7] if len(digits) >= 10 else '',
+        'street_address': _truncate(address.get('street_address'), Resume, 'street_address'),
+        'state': _truncate(address.get('state'), Resume, 'state'),
+        'zipcode': _truncate(address.get('zipcode'), Resume, 'zipcode'),
+    }
+
+
+def get_skill_ids(names):
+    """
+    :param names: Skill names
+    :return: Dictionary of name to Skill id, skills not stored yet are created
+    """
+    names = list(set(names))
+    skill_ids = {}
+    for i in range(0, len(names), LOOKUP_BATCH_SIZE):
+        skill_ids.update(Skill.objects.filter(name__in=names[i:i + LOOKUP_BATCH_SIZE]).values_list('name', 'id'))
+
+    missing = [name for name in names if name not in skill_ids]
+    while missing:
+        try:
+            with transaction.atomic():
+                Skill.objects.bulk_create([Skill(name=name) for name in missing])
+        except IntegrityError:
+            # Another worker stored some of them concurrently and none were inserted,
+            # the others are inserted again once those are found
+            conflict = True
+        else:
+            conflict = False
+
+        for i in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            skill_ids.update(Skill.objects.filter(name__in=missing[i:i + LOOKUP_BATCH_SIZE])
+                             .values_list('name', 'id'))
+
+        still_missing = [name for name in missing if name not in skill_ids]
+        if conflict and len(still_missing) == len(missing):
+            # Not a concurrent insert, retrying would fail the same way
+            raise IntegrityError('Could not store skills: ' + ', '.join(still_missing))
+        missing = still_missing
+
+    return skill_ids
+
+
+def save_resumes(parsed):
+    """
+    Stores full parse results in one transaction, with one bulk insert per
+    related table however many resumes and rows there are. A resume already
+    stored for an archive is replaced.
+    :param parsed: List of (ResumeArchive, resume_data) pairs
+    :return: List of the saved Resumes
+    """
+    with transaction.atomic():
+        Resume.objects.filter(file_id__in=[archive.pk for archive, _ in parsed]).delete()
+
+        skill_names = [_truncate(name, Skill, 'name') for _, resume_data in parsed
+                       for name in resume_data.get('skills') or []]
+        skill_ids = get_skill_ids(skill_names)
+
+        resumes = []
+        education = []
+        degrees = []
+        work_history = []
+        resume_skills = []
+        for archive, resume_data in parsed:
+            # One insert per resume, bulk_create does not return ids on every backend
+            resume = Resume.objects.create(file_id=archive, raw_text=resume_data.get('raw_text') or '',
+                                           **_resume_fields(resume_data['contact_info']))
+            resumes.append(resume)
+
+            education += [Education(resume=resume, university=_truncate(university, Education, 'university'))
+                          for university in resume_data.get('education') or []]
+            degrees += [Degree(resume=resume, name=_truncate(degree, Degree, 'name'))
+                        for degree in resume_data.get('degree') or []]
+            for position in resume_data.get('work_history') or []:
+                work_history.append(WorkHistory(
+                    resume=resume,
+                    organization=_truncate(position['organization'], WorkHistory, 'organization'),
+                    start_date=_to_date(position.get('start_date')),
+                    end_date=_to_date(position.get('end_date')),
+                    # A missing end date is unknown, an end date of None is an open end
+                    current='end_date' in position and position['end_date'] is None))
+
+            names = set(_truncate(name, Skill, 'name') for name in resume_data.get('skills') or [])
+            resume_skills += [Resume.skills.through(resume_id=resume.pk, skill_id=skill_ids[name])
+                              for name in names]
+
+        Education.objects.bulk_create(education)
+        Degree.objects.bulk_create(degrees)
+        WorkHistory.objects.bulk_create(work_history)
+        Resume.skills.through.objects.bulk_create(resume_skills)
+
+    return resumes
+
+
+def save_resume(archive, resume_data):
+    """
+    Stores the full parse result of an uploaded resume, see save_resumes().
+    :param archive: ResumeArchive the result was parsed from
+    :param resume_data: Parsed resume dictionary
+    :return: The saved Resume
+    """
+    return save_resumes([(archive, resume_data)])[0]
@@ -0,0 +1,141 @@
+"""
+Candidate search over stored resumes.
+
+Every filter is an indexed lookup that selects resume ids in a subquery. Full
+text queries use the FTS5 index created by migration 0010 on SQLite and fall
+back to scanning Resume.raw_text on other backends. The two do not match the
+same resumes: the index matches whole words by their Porter stem, so
+'managing' finds 'managed' but 'java' does not find 'javascript', while the
+fallback matches each word as a case insensitive substring, the other way
+round.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from .models import Degree, Education, Resume, Skill
+
+FULLTEXT_TABLE = 'api_resume_fts'
+
+SKILL_OPERATORS = ('and', 'or')
+
+# (connection alias, database name) -> whether it has FULLTEXT_TABLE, see has_fulltext_index()
+fulltext_databases = {}
+
+
+def _split(value):
+    """
+    :return: List of the comma separated values of a parameter
+    """
+    if not value:
+        return []
+
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def has_fulltext_index():
+    """
+    :return: Whether the database has the full text table, looked up once per database
+    """
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in fulltext_databases:
+        fulltext_databases[key] = (connection.vendor == 'sqlite' and
+                                   FULLTEXT_TABLE in connection.introspection.table_names())
+
+    return fulltext_databases[key]
+
+
+def fulltext_query(text):
+    """
+    :param text: Words to search for
+    :return: FTS5 query matching documents that contain every word, FTS5 operators in text are taken literally
+    """
+    return ' '.join('"%s"' % word.replace('"', '""') for word in text.split())
+
+
+class _Subquery(RawSQL):
+    """
+    Raw SELECT for an __in lookup. RawSQL adds parentheses of its own, which the
+    lookup wraps again, and SQLite then compares with only the first row.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def _skill_ids(names):
+    """
+    :param names: Skill names in any case
+    :return: Dictionary of lower cased name to the ids of the skills of that name
+    """
+    query = Q()
+    for name in names:
+        query |= Q(name__iexact=name)
+
+    skill_ids = {name.lower(): [] for name in names}
+    for skill_id, name in Skill.objects.filter(query).values_list('id', 'name'):
+        skill_ids[name.lower()].append(skill_id)
+
+    return skill_ids
+
+
+def filter_resumes(queryset, params):
+    """
+    :param queryset: Resumes to search
+    :param params: Query parameters, every one given must match:
+                   skill: Comma separated skill names, skill_op: 'and' for resumes with all of them, the
+                   default, or 'or' for any of them.
+                   degree, university, state, zipcode: Comma separated values, any of them matches.
+                   q: Words that must all appear in the resume text. Word stems match with the
+                   full text index, substrings of the text without it.
+    :return: Filtered queryset
+    :raises ValidationError: Keyed by the parameter, for an unknown skill_op or a null character in q
+    """
+    skill_op = params.get('skill_op', 'and').lower()
+    if skill_op not in SKILL_OPERATORS:
+        raise ValidationError({'skill_op': ['skill_op must be one of: %s' % ', '.join(SKILL_OPERATORS)]})
+
+    skills = _split(params.get('skill'))
+    if skills:
+        resume_skills = Resume.skills.through.objects
+        skill_ids = _skill_ids(skills)
+        if skill_op == 'or':
+            ids = [skill_id for ids in skill_ids.values() for skill_id in ids]
+            queryset = queryset.filter(id__in=resume_skills.filter(skill_id__in=ids).values('resume_id'))
+        else:
+            for ids in skill_ids.values():
+                queryset = queryset.filter(id__in=resume_skills.filter(skill_id__in=ids).values('resume_id'))
+
+    degrees = _split(params.get('degree'))
+    if degrees:
+        queryset = queryset.filter(id__in=Degree.objects.filter(name__in=degrees).values('resume_id'))
+
+    universities = _split(params.get('university'))
+    if universities:
+        queryset = queryset.filter(id__in=Education.objects.filter(university__in=universities)
+                                   .values('resume_id'))
+
+    states = _split(params.get('state'))
+    if states:
+        queryset = queryset.filter(state__in=[state.upper() for state in states])
+
+    zipcodes = _split(params.get('zipcode'))
+    if zipcodes:
+        queryset = queryset.filter(zipcode__in=zipcodes)
+
+    text = params.get('q', '').strip()
+    if '\x00' in text:
+        # SQLite ends the full text query at the null character
+        raise ValidationError({'q': ['Null characters are not allowed.']})
+
+    if text:
+        if has_fulltext_index():
+            queryset = queryset.filter(id__in=_Subquery(
+                'SELECT rowid FROM %s WHERE %s MATCH %%s' % (FULLTEXT_TABLE, FULLTEXT_TABLE),
+                [fulltext_query(text)]))
+        else:
+            for word in text.split():
+                queryset = queryset.filter(raw_text__icontains=word)
+
+    return queryset
@@ -1,7 +1,9 @@
+import json
+
+from django.db.models import Prefetch
 from rest_framework import serializers
-from rest_framework.reverse import reverse
 
-from .models import Resume, ResumeArchive
+from .models import Degree, Education, ParseJob, Resume, ResumeArchive, Skill, WorkHistory
 
 
 class ResumeArchiveSerializer(serializers.ModelSerializer):
@@ -12,16 +14,84 @@ class ResumeArchiveSerializer(serializers.ModelSerializer):
         fields = ('id', 'uploaded', 'datafile', )
 
 
+class WorkHistorySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = WorkHistory
+        fields = ('organization', 'start_date', 'end_date', 'current')
+
+
 class ResumeSerializer(serializers.ModelSerializer):
+    """
+    Serializes resumes loaded by setup_queryset(), the related fields are read
+    from the lists its prefetches store on each resume.
+    """
+
+    education = serializers.SlugRelatedField(source='education_list', many=True, read_only=True,
+                                             slug_field='university')
+    degree = serializers.SlugRelatedField(source='degree_list', many=True, read_only=True, slug_field='name')
+    work_history = WorkHistorySerializer(source='work_history_list', many=True, read_only=True)
+    skills = serializers.SlugRelatedField(source='skill_list', many=True, read_only=True, slug_field='name')
 
     class Meta:
         model = Resume
         fields = ('id', 'name', 'email', 'phone_number', 'area_code', 'street_address',
                   'state', 'zipcode', 'education', 'degree', 'work_history', 'skills')
 
-    def get_links(self, obj):
-        request = self.context['request']
+    def __init__(self, *args, **kwargs):
+        """
+        :param fields: Names of the fields to return, a sparse fieldset, or None for all of them
+        """
+        fields = kwargs.pop('fields', None)
+        super(ResumeSerializer, self).__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @staticmethod
+    def related_querysets():
+        """
+        Prefetches into plain lists, a related manager would build a queryset
+        per resume for each of them.
+        :return: Dictionary of related field name to the prefetch that loads it
+        """
         return {
-            'self': reverse('api-detail',
-                            kwargs={'pk': obj.pk}, request=request),
-        }
\ No newline at end of file
+            'education': Prefetch('education', queryset=Education.objects.only('resume', 'university'),
+                                  to_attr='education_list'),
+            'degree': Prefetch('degrees', queryset=Degree.objects.only('resume', 'name'), to_attr='degree_list'),
+            'work_history': Prefetch('work_history', queryset=WorkHistory.objects.all(),
+                                     to_attr='work_history_list'),
+            'skills': Prefetch('skills', queryset=Skill.objects.only('name'), to_attr='skill_list'),
+        }
+
+    @classmethod
+    def setup_queryset(cls, queryset, fields=None):
+        """
+        Loads only what the serializer returns: the columns of the fields, never
+        raw_text, and one query per related field for all resumes at once.
+        :param queryset: Resume queryset
+        :param fields: Sparse fieldset, or None for all fields
+        :return: Queryset to serialize
+        """
+        fields = cls.Meta.fields if fields is None else fields
+        related = cls.related_querysets()
+
+        columns = [name for name in fields if name not in related]
+        return (queryset.only('id', *columns)
+                .prefetch_related(*[related[name] for name in fields if name in related]))
+
+
+class ParseJobSerializer(serializers.ModelSerializer):
+
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ParseJob
+        fields = ('id', 'archive', 'status', 'created', 'updated', 'error', 'result')
+
+    def get_result(self, obj):
+        if obj.status != ParseJob.DONE:
+            return None
+
+        return json.loads(obj.result)
\ No newline at end of file
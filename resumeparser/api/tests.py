@@ -1,3 +1,414 @@
-from django.test import TestCase
+import copy
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone as django_timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from resumeparser.utils import cvparser
+from resumeparser.utils.sandbox import SandboxPool
+
+from . import batch, jobs, search
+from .cache import ParseCache
+from .management.commands.parse_resumes import JsonLinesWriter, parse_paths
+from .models import ParsedResult, ParseJob, Resume, ResumeArchive, Skill
+from .persist import get_skill_ids, save_resume, save_resumes
+from .search import filter_resumes
 
 # Create your tests here.
+resume_data = {
+    'contact_info': {
+        'person_name': {'full_name': 'John Smith', 'given_name': 'John', 'family_name': 'Smith'},
+        'contact_method': {
+            'telephone': '(804) 263-8574',
+            'email': 'john@example.com',
+            'address': {'street_address': '1 Main St', 'state': 'VA', 'zipcode': '23219'},
+        },
+    },
+    'education': ['Virginia Commonwealth University'],
+    'degree': ['BS', 'MS'],
+    'work_history': [
+        {'organization': 'Dominion Resources', 'start_date': datetime.datetime(2015, 1, 1), 'end_date': None},
+        # Cached results hold the dates as ISO strings
+        {'organization': 'Oracle', 'start_date': '2010-06-01T00:00:00', 'end_date': '2014-12-01T00:00:00'},
+        {'organization': 'Best Buy', 'start_date': '2008-01-01T00:00:00'},
+    ],
+    'skills': ['python', 'java', 'oracle'],
+}
+
+
+class SaveResumeTests(TestCase):
+
+    def setUp(self):
+        self.archive = ResumeArchive.objects.create(datafile='resumes/a.pdf')
+
+    def test_save_resume(self):
+        resume = save_resume(self.archive, resume_data)
+
+        self.assertEqual((resume.name, resume.email, resume.area_code, resume.state),
+                         ('John Smith', 'john@example.com', '804', 'VA'))
+        self.assertEqual(sorted(resume.skills.values_list('name', flat=True)), ['java', 'oracle', 'python'])
+        self.assertEqual(list(resume.education.values_list('university', flat=True)),
+                         ['Virginia Commonwealth University'])
+        self.assertEqual(sorted(resume.degrees.values_list('name', flat=True)), ['BS', 'MS'])
+        self.assertEqual(list(resume.work_history.values_list('organization', 'start_date', 'end_date', 'current')), [
+            ('Dominion Resources', datetime.date(2015, 1, 1), None, True),
+            ('Oracle', datetime.date(2010, 6, 1), datetime.date(2014, 12, 1), False),
+            ('Best Buy', datetime.date(2008, 1, 1), None, False),
+        ])
+
+    def test_replace_and_share_skills(self):
+        other = ResumeArchive.objects.create(datafile='resumes/b.pdf')
+        save_resume(self.archive, resume_data)
+        save_resumes([(self.archive, resume_data), (other, dict(resume_data, skills=['python', 'sql']))])
+
+        self.assertEqual(Resume.objects.count(), 2)
+        self.assertEqual(Skill.objects.count(), 4)
+        self.assertEqual(Skill.objects.get(name='python').resumes.count(), 2)
+
+    def test_concurrent_skill_insert(self):
+        filter_skills = Skill.objects.filter
+
+        def racing_filter(*args, **kwargs):
+            # Another worker stores one of the new skills after they were looked up
+            skills = list(filter_skills(*args, **kwargs).values_list('name', 'id'))
+            if not filter_skills(name='sql').exists():
+                Skill.objects.create(name='sql')
+            return mock.Mock(values_list=mock.Mock(return_value=skills))
+
+        with mock.patch.object(Skill.objects, 'filter', side_effect=racing_filter):
+            skill_ids = get_skill_ids(['python', 'sql', 'cobol'])
+
+        self.assertEqual(skill_ids, dict(Skill.objects.values_list('name', 'id')))
+        self.assertEqual(sorted(skill_ids), ['cobol', 'python', 'sql'])
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        archives = [ResumeArchive.objects.create(datafile='resumes/%d.pdf' % i) for i in range(3)]
+        contact_info = copy.deepcopy(resume_data['contact_info'])
+        contact_info['contact_method']['address'] = {'street_address': '', 'state': 'CA', 'zipcode': '94105'}
+        save_resumes([
+            (archives[0], dict(resume_data, raw_text='Built machine learning pipelines in Python')),
+            (archives[1], dict(resume_data, skills=['python', 'sql'], degree=['MBA'],
+                               raw_text='Managed SQL Server databases')),
+            (archives[2], dict(resume_data, skills=['java'], contact_info=contact_info,
+                               raw_text='Java and SQL developer')),
+        ])
+        self.names = dict(Resume.objects.values_list('file_id__datafile', 'id'))
+
+    def search(self, **params):
+        return sorted(name for name, resume_id in self.names.items()
+                      if resume_id in filter_resumes(Resume.objects.all(), params).values_list('id', flat=True))
+
+    def test_filters(self):
+        self.assertEqual(self.search(skill='Python,SQL'), ['resumes/1.pdf'])
+        self.assertEqual(self.search(skill='oracle,sql', skill_op='or'), ['resumes/0.pdf', 'resumes/1.pdf'])
+        self.assertEqual(self.search(skill='python,cobol'), [])
+        self.assertEqual(self.search(degree='MBA'), ['resumes/1.pdf'])
+        self.assertEqual(self.search(state='ca'), ['resumes/2.pdf'])
+        self.assertEqual(self.search(zipcode='23219', skill='java,python', skill_op='or'),
+                         ['resumes/0.pdf', 'resumes/1.pdf'])
+        self.assertEqual(self.search(university='Virginia Commonwealth University', degree='MS'),
+                         ['resumes/0.pdf', 'resumes/2.pdf'])
+
+    def test_full_text(self):
+        self.assertEqual(self.search(q='learning python'), ['resumes/0.pdf'])
+        self.assertEqual(self.search(q='database'), ['resumes/1.pdf'])
+        self.assertEqual(self.search(q='sql'), ['resumes/1.pdf', 'resumes/2.pdf'])
+        self.assertEqual(self.search(q='"python" OR'), [])
+        with self.assertRaises(ValidationError) as raised:
+            self.search(skill='python', skill_op='xor')
+        self.assertEqual(list(raised.exception.detail), ['skill_op'])
+        with self.assertRaises(ValidationError) as raised:
+            self.search(q='sql\x00')
+        self.assertEqual(list(raised.exception.detail), ['q'])
+
+    def test_full_text_stems(self):
+        self.assertEqual(self.search(q='managing'), ['resumes/1.pdf'])
+        self.assertEqual(self.search(q='ava'), [])
+
+    def test_full_text_index_lookup(self):
+        with mock.patch.dict(search.fulltext_databases, clear=True), \
+                mock.patch.object(connection.introspection, 'table_names',
+                                  wraps=connection.introspection.table_names) as table_names:
+            self.assertEqual(self.search(q='sql'), ['resumes/1.pdf', 'resumes/2.pdf'])
+            self.assertEqual(self.search(q='java'), ['resumes/2.pdf'])
+        self.assertEqual(table_names.call_count, 1)
+
+    @mock.patch('resumeparser.api.search.has_fulltext_index', return_value=False)
+    def test_full_text_without_index(self, has_fulltext_index):
+        self.assertEqual(self.search(q='learning python'), ['resumes/0.pdf'])
+        self.assertEqual(self.search(q='sql', skill='java'), ['resumes/2.pdf'])
+        # Substrings match instead of stems
+        self.assertEqual(self.search(q='ava'), ['resumes/2.pdf'])
+        self.assertEqual(self.search(q='managing'), [])
+
+
+class ResumeListTests(TestCase):
+
+    def setUp(self):
+        archives = [ResumeArchive.objects.create(datafile='resumes/%d.pdf' % i) for i in range(3)]
+        self.ids = [resume.id for resume in save_resumes([(archive, resume_data) for archive in archives])]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('reader'))
+
+    def test_pages(self):
+        response = self.client.get('/api/resumes/', {'page_size': 2})
+        self.assertEqual([resume['id'] for resume in response.data['results']], self.ids[:0:-1])
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([resume['id'] for resume in response.data['results']], self.ids[:1])
+        self.assertIsNone(response.data['next'])
+
+    def test_fieldset(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/resumes/', {'fields': 'id,state,skills'})
+        resume = response.data['results'][0]
+        self.assertEqual((sorted(resume), resume['id'], sorted(resume['skills'])),
+                         (['id', 'skills', 'state'], self.ids[-1], ['java', 'oracle', 'python']))
+
+        response = self.client.get('/api/resumes/%d/' % self.ids[0], {'fields': 'email'})
+        self.assertEqual(response.data, {'email': 'john@example.com'})
+
+    def test_update(self):
+        response = self.client.patch('/api/resumes/%d/' % self.ids[0], {'name': 'Jane Doe'})
+        self.assertEqual((response.data['name'], sorted(response.data['skills'])),
+                         ('Jane Doe', ['java', 'oracle', 'python']))
+        self.assertEqual(Resume.objects.get(id=self.ids[0]).name, 'Jane Doe')
+
+        self.assertEqual(self.client.delete('/api/resumes/%d/' % self.ids[0]).status_code, 204)
+        self.assertFalse(Resume.objects.filter(id=self.ids[0]).exists())
+        self.assertEqual(self.client.get('/api/resumes/', {'fields': 'raw_text'}).status_code, 400)
+
+
+def _slow_process(data, fields=None):
+    # Runs in the batch workers, which are forked after it is patched in
+    data = data if isinstance(data, bytes) else data.read()
+    if b'hang' in data:
+        time.sleep(60)
+    return {field: None for field in cvparser.STORED_FIELDS}
+
+
+class BatchTests(SimpleTestCase):
+
+    def setUp(self):
+        pool = SandboxPool(2, timeout=1)
+        patches = [mock.patch.object(batch, 'pool', pool), mock.patch.object(batch, 'executor', None),
+                   mock.patch.object(cvparser, 'process', _slow_process),
+                   mock.patch.object(batch.parse_cache, 'get', return_value=None),
+                   mock.patch.object(batch.parse_cache, 'set')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_timeout(self):
+        files = [SimpleUploadedFile('a.pdf', b'%PDF-1.4 hang'), SimpleUploadedFile('b.pdf', b'%PDF-1.4 ok')]
+        records = [json.loads(line) for line in batch.parse_many(files)]
+
+        self.assertEqual(sorted((record['filename'], record['status'], record.get('code')) for record in records),
+                         [('a.pdf', 'error', 'timeout'), ('b.pdf', 'ok', None)])
+
+    def test_file_type(self):
+        # Detected from the contents, not the name
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as package:
+            package.writestr('c.pdf', b'%PDF-1.4 ok')
+        docx = io.BytesIO()
+        with zipfile.ZipFile(docx, 'w') as package:
+            package.writestr('word/document.xml', '<document/>')
+
+        files = [SimpleUploadedFile('a.docx', b'%PDF-1.4 ok'), SimpleUploadedFile('b.pdf', b'ok'),
+                 SimpleUploadedFile('resumes.bin', archive.getvalue()), SimpleUploadedFile('d.zip', docx.getvalue()),
+                 SimpleUploadedFile('e.zip', b'PK\x03\x04 truncated')]
+        records = [json.loads(line) for line in batch.parse_many(files)]
+
+        self.assertEqual(sorted((record['filename'], record['status'], record.get('error', '')[:16])
+                                for record in records),
+                         [('a.docx', 'ok', ''), ('b.pdf', 'error', 'Unsupported file'), ('c.pdf', 'ok', ''),
+                          ('d.zip', 'ok', ''), ('e.zip', 'error', 'Invalid zip file')])
+
+    @override_settings(PARSE_BATCH_MAX_FILE_SIZE=20)
+    def test_file_size(self):
+        files = [SimpleUploadedFile('a.pdf', b'%PDF-1.4 ' + b'x' * 20), SimpleUploadedFile('b.pdf', b'%PDF-1.4 ok')]
+        records = [json.loads(line) for line in batch.parse_many(files)]
+
+        self.assertEqual([(record['filename'], record['status'], record.get('error')) for record in records],
+                         [('a.pdf', 'error', 'File too large'), ('b.pdf', 'ok', None)])
+
+    @override_settings(PARSE_BATCH_WORKERS=1)
+    def test_window(self):
+        read = []
+
+        def uploads(files):
+            for i in range(10):
+                read.append(i)
+                yield 'resume%d.pdf' % i, b'%PDF-1.4 ' + str(i).encode(), None
+
+        with mock.patch.object(batch, 'iter_uploads', uploads):
+            lines = batch.parse_many([])
+            next(lines)
+            # Two files are submitted per worker before the first result is taken
+            self.assertEqual(read, [0, 1])
+            self.assertEqual(len(list(lines)), 9)
+
+
+class ParseResumesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name, data=b''):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as resume_file:
+            resume_file.write(data)
+        return path
+
+    def test_resume_after_kill(self):
+        # The run was killed while writing its third record
+        output = self.path('out.jsonl', b'{"file_path": "a.pdf"}\n{"file_path": "b.pdf"}\n{"file_pa')
+        writer = JsonLinesWriter(output)
+        self.assertEqual(writer.done(), {'a.pdf', 'b.pdf'})
+
+        writer.open()
+        writer.write('c.pdf', None, 'error')
+        writer.close()
+        self.assertEqual(JsonLinesWriter(output).done(), {'a.pdf', 'b.pdf', 'c.pdf'})
+
+    def test_timeout(self):
+        paths = [self.path('a.pdf', b'%PDF-1.4 hang'), self.path('b.pdf', b'%PDF-1.4 ok')]
+        with mock.patch.object(cvparser, 'process', _slow_process):
+            results = sorted(parse_paths(SandboxPool(2, timeout=1), paths, 4))
+
+        self.assertEqual([(path, error) for path, _, error in results],
+                         [(paths[0], 'timeout: Extraction took longer than 1 seconds'), (paths[1], None)])
+
+
+def _es_indices(uuid):
+    es = mock.Mock()
+    es.indices.get.return_value = {
+        name: {'settings': {'index': {'uuid': uuid + name}}, 'mappings': {'properties': {'name': {'type': 'text'}}}}
+        for name in ('companies', 'universities')}
+    return es
+
+
+class ParserVersionTests(TestCase):
+
+    def setUp(self):
+        patch = mock.patch.object(cvparser, 'es_version', (None, 0))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_backends(self):
+        with mock.patch.object(cvparser, 'LOOKUP_BACKEND', 'local'):
+            local = cvparser.parser_version()
+        with mock.patch.object(cvparser, '_get_es', return_value=_es_indices('a')):
+            elasticsearch = cvparser.parser_version()
+        # A recreated index has a new uuid
+        with mock.patch.object(cvparser, 'es_version', (None, 0)), \
+                mock.patch.object(cvparser, '_get_es', return_value=_es_indices('b')):
+            recreated = cvparser.parser_version()
+
+        self.assertTrue(local.endswith(':local'))
+        self.assertTrue(elasticsearch.startswith(local[:-len('local')] + 'es-'))
+        self.assertNotEqual(elasticsearch, recreated)
+        self.assertLessEqual(len(recreated), ParsedResult._meta.get_field('version').max_length)
+
+    def test_unknown_version_is_not_cached(self):
+        parse_cache = ParseCache(10)
+        with mock.patch.object(cvparser, '_get_es', side_effect=ConnectionError('down')):
+            parse_cache.set('digest', {'skills': ['python']})
+            self.assertIsNone(parse_cache.get('digest'))
+
+        self.assertFalse(ParsedResult.objects.exists())
+
+
+@override_settings(PARSE_JOBS_IN_PROCESS=False, PARSE_JOB_LEASE=60, PARSE_JOB_MAX_ATTEMPTS=2)
+class ParseJobTests(TestCase):
+
+    def setUp(self):
+        archive = ResumeArchive()
+        archive.datafile.save('a.pdf', ContentFile(b'%PDF-1.4'))
+        self.addCleanup(archive.datafile.delete, save=False)
+        self.job = jobs.enqueue(archive)
+
+    def expire(self):
+        ParseJob.objects.filter(id=self.job.id).update(
+            claimed_at=django_timezone.now() - datetime.timedelta(seconds=61))
+
+    def test_expired_lease(self):
+        claimed = jobs.claim_job()
+        self.assertEqual((claimed.status, claimed.attempts), (ParseJob.RUNNING, 1))
+        # Within the lease the job is left to its worker
+        self.assertEqual(jobs.requeue_expired(), 0)
+
+        # The worker was recycled while running the job
+        self.expire()
+        self.assertEqual(jobs.requeue_expired(), 1)
+        self.assertEqual(ParseJob.objects.get(id=self.job.id).status, ParseJob.QUEUED)
+
+        # A worker that lost its lease does not overwrite the job run elsewhere
+        reclaimed = jobs.claim_job()
+        with mock.patch.object(jobs.cache, 'process', return_value=None):
+            jobs.run_job(claimed)
+        self.assertEqual(ParseJob.objects.get(id=self.job.id).status, ParseJob.RUNNING)
+        with mock.patch.object(jobs.cache, 'process', return_value=None):
+            jobs.run_job(reclaimed)
+        self.assertEqual(ParseJob.objects.get(id=self.job.id).status, ParseJob.DONE)
+
+    def test_status_is_a_read(self):
+        jobs.claim_job()
+        self.expire()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('reader'))
+
+        response = client.get('/api/resumes/jobs/%d/' % self.job.id)
+        self.assertEqual(response.data['status'], ParseJob.RUNNING)
+        # Expired jobs are queued again by the job runners only
+        self.assertEqual(ParseJob.objects.get(id=self.job.id).status, ParseJob.RUNNING)
+
+    def test_abandoned_job_fails(self):
+        for _ in range(2):
+            jobs.claim_job()
+            self.expire()
+            jobs.requeue_expired()
+
+        job = ParseJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.attempts), (ParseJob.FAILED, 2))
+
+
+@override_settings(PARSE_JOBS_IN_PROCESS=False, PARSE_JOB_LEASE=0.3)
+class ParseJobLeaseTests(TransactionTestCase):
+
+    def test_lease_is_renewed(self):
+        archive = ResumeArchive()
+        archive.datafile.save('a.pdf', ContentFile(b'%PDF-1.4'))
+        self.addCleanup(archive.datafile.delete, save=False)
+        jobs.enqueue(archive)
+        requeued = []
+
+        def slow_process(datafile):
+            # Longer than the lease, another worker looks for expired jobs meanwhile
+            time.sleep(1)
+            requeued.append(jobs.requeue_expired())
+
+        with mock.patch.object(jobs.cache, 'process', slow_process):
+            jobs.run_job(jobs.claim_job())
+
+        self.assertEqual(requeued, [0])
+        self.assertEqual(ParseJob.objects.get().status, ParseJob.DONE)
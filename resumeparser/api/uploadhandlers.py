@@ -0,0 +1,37 @@
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingMixin(object):
+    """
+    Computes the SHA-256 of an upload while its chunks stream in and stores it
+    as the `sha256` attribute of the resulting file, so the file does not have
+    to be read again to look up cached parse results.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Set up first, MemoryFileUploadHandler.new_file raises StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        data = super().receive_data_chunk(raw_data, start)
+        if data is None:
+            # This handler consumed the chunk, later handlers will not see it
+            self.sha256.update(raw_data)
+        return data
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        if upload is not None:
+            upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,12 +1,50 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import authentication, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from resumeparser.utils import cvparser
+from resumeparser.utils import cvparser, metrics, resources
+from resumeparser.utils.sandbox import ExtractionError
 
-from .models import Resume
-from .serializers import ResumeSerializer, ResumeArchiveSerializer
+from . import batch, cache, jobs, persist, search
+from .models import ParseJob, Resume
+from .serializers import ParseJobSerializer, ResumeSerializer, ResumeArchiveSerializer
+
+
+def ready(request):
+    """ Readiness check, 503 until the parser resources are loaded. """
+    is_ready = resources.is_ready()
+    return JsonResponse({'ready': is_ready}, status=200 if is_ready else 503)
+
+
+def metrics_view(request):
+    """ Parser timings and counters in the Prometheus text format. """
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def stored_file(archive, uploaded_file):
+    """
+    The stored copy of an upload, opened for parsing. Storage moved the spooled
+    upload there or wrote it out, and a file on local disk is mapped instead of
+    read again and handed to extraction workers by path.
+    :param archive: Saved ResumeArchive
+    :param uploaded_file: The upload, returned when the storage is not on local disk
+    :return: Open file
+    """
+    try:
+        archive.datafile.path
+    except NotImplementedError:
+        return uploaded_file
+
+    archive.datafile.open('rb')
+    return archive.datafile
 
 
 class DefaultsMixin(object):
@@ -21,10 +59,28 @@ class DefaultsMixin(object):
     )
 
 
+class ResumeCursorPagination(CursorPagination):
+    """ Newest resumes first, pages continue from the id of the last resume instead of an offset. """
+
+    ordering = '-id'
+    page_size = settings.RESUME_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RESUME_MAX_PAGE_SIZE
+
+
 class ResumeViewSet(DefaultsMixin, ModelViewSet):
 
     queryset = Resume.objects.all()
     parser_classes = (MultiPartParser, FormParser, )
+    pagination_class = ResumeCursorPagination
+    read_actions = ('list', 'retrieve', 'search')
+
+    def get_queryset(self):
+        queryset = super(ResumeViewSet, self).get_queryset()
+        if self.action not in self.read_actions:
+            return queryset
+
+        return ResumeSerializer.setup_queryset(queryset, self.get_fieldset())
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -32,30 +88,130 @@ class ResumeViewSet(DefaultsMixin, ModelViewSet):
 
         return ResumeSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs['fields'] = fieldset
+
+        return super(ResumeViewSet, self).get_serializer(*args, **kwargs)
+
+    def get_fieldset(self):
+        """
+        Resume fields to return, from the comma separated `fields` parameter of
+        reads. The parameter selects the fields to parse for uploads instead.
+        :return: List of field names, or None for all fields
+        """
+        value = self.request.query_params.get('fields')
+        if self.action not in self.read_actions or not value:
+            return None
+
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in ResumeSerializer.Meta.fields]
+        if unknown:
+            raise ValidationError({'fields': ['Unknown field: %s' % ', '.join(unknown)]})
+
+        return fields
+
+    def perform_update(self, serializer):
+        resume = serializer.save()
+        # Serialize the response from the related lists the reads prefetch
+        serializer.instance = ResumeSerializer.setup_queryset(Resume.objects.filter(pk=resume.pk)).get()
+
     def perform_create(self, serializer):
         uploaded_file = self.request.data.get('datafile')
-        serializer.save(datafile=uploaded_file)
+        archive = serializer.save(datafile=uploaded_file)
+
+        resume_file = stored_file(archive, uploaded_file)
+        try:
+            resume_data = cache.process(resume_file, digest=cache.file_hash(uploaded_file),
+                                        fields=self.parse_fields)
+        finally:
+            if resume_file is not uploaded_file:
+                resume_file.close()
+
+        # Only full parses are stored, their raw text is not returned
+        if resume_data and not self.parse_fields:
+            persist.save_resume(archive, resume_data)
+            resume_data = cvparser.select_fields(resume_data, cvparser.DEFAULT_FIELDS)
 
-        resume_data = cvparser.process(uploaded_file)
-        response_data = resume_data.copy()
-        # TODO: Remove after proper DB is added
-        if resume_data:
-            resume_data['file_id'] = serializer.data['id']
-            resume_data['education'] = ', '.join(resume_data['education'])
-            resume_data['degree'] = ', '.join(resume_data['degree'])
-            resume_data['work_history'] = ''
-            # resume_data['work_history'] = ', '.join(resume_data['work_history'])
-            resume_data['skills'] = ', '.join(resume_data['skills'])
+        return resume_data
+
+    def perform_create_async(self, serializer):
+        uploaded_file = self.request.data.get('datafile')
+        archive = serializer.save(datafile=uploaded_file)
+        return jobs.enqueue(archive)
 
-        resume_serializer = ResumeSerializer(data=resume_data)
-        # if resume_serializer.is_valid():
-            # resume_serializer.save()
+    def get_parse_fields(self):
+        """
+        Fields to extract, from the comma separated `fields` parameter.
+        :return: List of field names, or None for all fields
+        """
+        value = self.request.query_params.get('fields') or self.request.data.get('fields')
+        if not value:
+            return None
 
-        return response_data
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        try:
+            cvparser.resolve_stages(fields)
+        except ValueError as e:
+            raise ValidationError({'fields': [str(e)]})
+
+        return fields
+
+    def is_async(self):
+        value = self.request.query_params.get('async')
+        if value is None:
+            return settings.PARSE_ASYNC
+
+        return value.lower() in ('1', 'true', 'yes')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        response_data = self.perform_create(serializer)
+        self.parse_fields = self.get_parse_fields()
+
+        if self.is_async():
+            job = self.perform_create_async(serializer)
+            job_url = reverse('resume-job', kwargs={'job_id': job.id}, request=request)
+            response_data = {'job_id': job.id, 'status': job.status, 'url': job_url}
+            return Response(response_data, status=status.HTTP_202_ACCEPTED, headers={'Location': job_url})
+
+        try:
+            response_data = self.perform_create(serializer)
+        except ExtractionError as e:
+            # The upload is kept, its text could not be read within the extraction limits
+            return Response({'error': e.code, 'detail': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
         headers = self.get_success_headers(serializer.data)
-        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
\ No newline at end of file
+        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=False, url_path=r'jobs/(?P<job_id>[0-9]+)')
+    def job(self, request, job_id=None):
+        job = get_object_or_404(ParseJob, pk=job_id)
+        return Response(ParseJobSerializer(job).data)
+
+    @action(detail=False, url_path='search')
+    def search(self, request):
+        limit = request.query_params.get('limit', settings.RESUME_SEARCH_MAX_RESULTS)
+        try:
+            limit = min(int(limit), settings.RESUME_SEARCH_MAX_RESULTS)
+        except ValueError:
+            raise ValidationError({'limit': ['A whole number is required.']})
+
+        queryset = search.filter_resumes(self.get_queryset(), request.query_params)
+        serializer = self.get_serializer(queryset.order_by('-id')[:max(limit, 0)], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='cache')
+    def cache_stats(self, request):
+        return Response(cache.parse_cache.stats())
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def create_batch(self, request):
+        files = request.FILES.getlist('datafile')
+        if not files:
+            return Response({'datafile': ['No files were submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        self.parse_fields = self.get_parse_fields()
+        return StreamingHttpResponse(batch.parse_many(files, self.parse_fields),
+                                     content_type='application/x-ndjson')
\ No newline at end of file
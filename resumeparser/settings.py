@@ -81,6 +81,54 @@ DATABASES = {
 MEDIA_ROOT = os.path.join(BASE_DIR, 'documents')
 MEDIA_URL = '/documents/'
 
+# Resume parse jobs
+# POST /api/resumes/?async=1 stores the upload, queues a ParseJob and returns 202.
+# Queued jobs are run by `manage.py run_parse_jobs`. PARSE_JOBS_IN_PROCESS runs
+# them on a thread pool inside the web process instead, which ties up request
+# workers and is meant for development only.
+# A worker leases the job it runs for PARSE_JOB_LEASE seconds and renews the
+# lease while the parse runs. Jobs whose lease expired, because their process
+# was recycled or crashed, are queued again, and fail once they were abandoned
+# PARSE_JOB_MAX_ATTEMPTS times.
+
+PARSE_ASYNC = False
+PARSE_JOBS_IN_PROCESS = False
+PARSE_JOB_WORKERS = 2
+PARSE_JOB_LEASE = 600
+PARSE_JOB_MAX_ATTEMPTS = 3
+
+# POST /api/resumes/batch/ parses many files or zip archives on a pool of
+# PARSE_BATCH_WORKERS processes and streams one NDJSON line per resume as each
+# parse finishes. A worker is killed when a parse takes more than
+# PARSE_BATCH_TIMEOUT seconds, and the memory limit of text extraction applies.
+
+PARSE_BATCH_WORKERS = os.cpu_count()
+PARSE_BATCH_MAX_FILE_SIZE = 20 * 1024 * 1024
+PARSE_BATCH_TIMEOUT = 120
+
+# Parse results are cached by the SHA-256 of the uploaded file and the parser
+# version, in an in-process LRU of PARSE_CACHE_SIZE entries and the database.
+# Uploads are hashed while they stream in by the handlers below.
+
+PARSE_CACHE_SIZE = 1024
+
+# GET /api/resumes/search/ returns the newest matching resumes, `limit` of
+# them and at most RESUME_SEARCH_MAX_RESULTS.
+
+RESUME_SEARCH_MAX_RESULTS = 100
+
+# GET /api/resumes/ returns pages of RESUME_PAGE_SIZE resumes, newest first,
+# with `next` and `previous` cursor links. Clients may ask for up to
+# RESUME_MAX_PAGE_SIZE with `page_size`.
+
+RESUME_PAGE_SIZE = 50
+RESUME_MAX_PAGE_SIZE = 500
+
+FILE_UPLOAD_HANDLERS = [
+    'resumeparser.api.uploadhandlers.HashingMemoryFileUploadHandler',
+    'resumeparser.api.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -17,9 +17,12 @@ from django.conf.urls import include, url
 from rest_framework.authtoken.views import obtain_auth_token
 
 from resumeparser.api.urls import router
+from resumeparser.api.views import metrics_view, ready
 
 
 urlpatterns = [
     url(r'^api/token/', obtain_auth_token, name='api-token'),
+    url(r'^api/ready/$', ready, name='api-ready'),
+    url(r'^metrics$', metrics_view, name='metrics'),
     url(r'^api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Compact binary file of typed arrays, opened with mmap.
+
+The parser dictionaries are compiled into one such file so that every worker
+process maps the same physical pages instead of building its own Python
+objects. Arrays are read in place through memoryview casts.
+
+Layout, the header is little endian and arrays use the byte order of the
+machine that built the file, which is recorded in the metadata:
+
+    MAGIC, format version (u32), number of sections (u32)
+    per section: name length (u16), name, typecode (1 byte), offset (u64), size in bytes (u64)
+    section data, each aligned to 8 bytes
+"""
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b'RPARTIF\0'
+FORMAT_VERSION = 1
+
+_header = struct.Struct('<II')
+_entry = struct.Struct('<cQQ')
+
+
+def _pad(size):
+    return -size % 8
+
+
+def write_artifact(path, sections, meta):
+    """
+    Writes sections to path atomically, processes that mapped the old file keep it.
+    :param path: Output file
+    :param sections: Dict of name -> array.array, or bytes for raw data
+    :param meta: JSON serializable dict stored with the sections
+    """
+    sections = dict(sections)
+    meta = dict(meta, byteorder=sys.byteorder)
+    sections['meta'] = json.dumps(meta, sort_keys=True).encode('utf-8')
+
+    directory = b''
+    for name in sections:
+        directory += struct.pack('<H', len(name)) + name.encode('utf-8') + _entry.pack(b'B', 0, 0)
+    offset = len(MAGIC) + _header.size + len(directory)
+    offset += _pad(offset)
+
+    entries = []
+    blobs = []
+    for name, data in sections.items():
+        if isinstance(data, array.array):
+            typecode, data = data.typecode, data.tobytes()
+        else:
+            typecode = 'B'
+        entries.append(struct.pack('<H', len(name)) + name.encode('utf-8') +
+                       _entry.pack(typecode.encode('ascii'), offset, len(data)))
+        blobs.append(data + b'\0' * _pad(len(data)))
+        offset += len(data) + _pad(len(data))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as output:
+        output.write(MAGIC + _header.pack(FORMAT_VERSION, len(sections)))
+        output.write(b''.join(entries))
+        output.write(b'\0' * _pad(output.tell()))
+        for blob in blobs:
+            output.write(blob)
+    os.replace(tmp_path, path)
+
+
+class Artifact(object):
+    """
+    Read only view of a file written by write_artifact().
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Artifact file
+        :raises ValueError: If the file is not an artifact of this format version
+        """
+        with open(path, 'rb') as artifact_file:
+            self._mmap = mmap.mmap(artifact_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if bytes(self._view[:len(MAGIC)]) != MAGIC:
+            raise ValueError('%s is not a parser artifact' % path)
+        version, count = _header.unpack_from(self._mmap, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError('%s has format version %d, expected %d' % (path, version, FORMAT_VERSION))
+
+        self._sections = {}
+        position = len(MAGIC) + _header.size
+        for _ in range(count):
+            name_length, = struct.unpack_from('<H', self._mmap, position)
+            position += 2
+            name = bytes(self._view[position:position + name_length]).decode('utf-8')
+            position += name_length
+            typecode, offset, size = _entry.unpack_from(self._mmap, position)
+            position += _entry.size
+            self._sections[name] = (typecode.decode('ascii'), offset, size)
+
+        self.meta = json.loads(bytes(self.section('meta')).decode('utf-8'))
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError('%s was built on a %s endian machine' % (path, self.meta['byteorder']))
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def section(self, name):
+        """
+        :param name: Section name
+        :return: memoryview of the section cast to its typecode, no data is copied
+        """
+        typecode, offset, size = self._sections[name]
+        view = self._view[offset:offset + size]
+        return view if typecode == 'B' else view.cast(typecode)
+
+
+def add_strings(sections, name, strings):
+    """
+    Adds a string table section pair, see StringTable.
+    """
+    offsets = array.array('I', [0])
+    data = bytearray()
+    for string in strings:
+        data += string.encode('utf-8')
+        offsets.append(len(data))
+
+    sections[name + '.offsets'] = offsets
+    sections[name + '.data'] = bytes(data)
+
+
+def _hash(data):
+    return zlib.crc32(data)
+
+
+def add_hash_index(sections, name, strings):
+    """
+    Adds a string table and an open addressing table mapping each string to its
+    position, see StringIndex. Strings must be unique.
+    """
+    add_strings(sections, name, strings)
+
+    encoded = [string.encode('utf-8') for string in strings]
+    size = 1
+    while size < 2 * len(encoded) + 1:
+        size *= 2
+
+    # Slots hold position + 1, 0 marks an empty slot
+    slots = array.array('I', [0]) * size
+    for i, data in enumerate(encoded):
+        slot = _hash(data) & (size - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = i + 1
+    sections[name + '.slots'] = slots
+
+
+class StringTable(object):
+    """
+    Strings stored as one UTF-8 blob and an offsets array.
+    """
+
+    def __init__(self, artifact, name):
+        self._offsets = artifact.section(name + '.offsets')
+        self._data = artifact.section(name + '.data')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def raw(self, i):
+        return self._data[self._offsets[i]:self._offsets[i + 1]]
+
+
+class StringIndex(StringTable):
+    """
+    StringTable with constant time lookup of a string's position.
+    """
+
+    def __init__(self, artifact, name):
+        super(StringIndex, self).__init__(artifact, name)
+        self._slots = artifact.section(name + '.slots')
+        self._mask = len(self._slots) - 1
+
+    def index(self, string):
+        """
+        :return: Position of string, or -1 if absent
+        """
+        data = string.encode('utf-8')
+        slots = self._slots
+        slot = _hash(data) & self._mask
+        while slots[slot]:
+            i = slots[slot] - 1
+            if self.raw(i) == data:
+                return i
+            slot = (slot + 1) & self._mask
+
+        return -1
+
+    def __contains__(self, string):
+        return self.index(string) >= 0
+
+
+class StringMap(object):
+    """
+    Read only string to string mapping built by add_string_map().
+    """
+
+    def __init__(self, artifact, name):
+        self._keys = StringIndex(artifact, name + '.keys')
+        self._values = StringTable(artifact, name + '.values')
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key, default=None):
+        i = self._keys.index(key)
+        if i < 0:
+            return default
+
+        return self._values[i]
+
+
+def add_string_map(sections, name, mapping):
+    keys = list(mapping)
+    add_hash_index(sections, name + '.keys', keys)
+    add_strings(sections, name + '.values', [mapping[key] for key in keys])
@@ -0,0 +1,181 @@
+"""
+Read only buffers of resume files, shared instead of copied.
+
+An upload is spooled once, to memory or to a file, by the upload handlers.
+map_file() exposes either as one buffer: files are mapped with mmap and
+in-memory files are viewed in place. Parsers read the buffer through
+BufferReader, and extraction workers are handed the path of a mapped file to
+map themselves, so the contents of a multi-MB resume are neither read into
+the process nor pickled to a worker.
+"""
+import io
+import mmap
+import os
+from contextlib import contextmanager
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable binary file over a buffer, a read copies only the bytes asked for.
+    """
+
+    def __init__(self, data):
+        """
+        :param data: Bytes-like object of single bytes, such as a memoryview
+        """
+        super(BufferReader, self).__init__()
+        self._data = data
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        end = len(self._data) if size is None or size < 0 else self._position + size
+        data = bytes(self._data[self._position:end])
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self._data[self._position:self._position + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # Relative positions before the start are clamped to it, as in BytesIO
+        if whence == io.SEEK_SET:
+            if offset < 0:
+                raise ValueError('negative seek value %d' % offset)
+        elif whence == io.SEEK_CUR:
+            offset = max(0, self._position + offset)
+        else:
+            offset = max(0, len(self._data) + offset)
+
+        self._position = offset
+        return offset
+
+    def tell(self):
+        return self._position
+
+
+class FileBuffer(object):
+    """
+    Contents of a file as a memoryview, see map_file(). Use it as a context
+    manager, the view must be released before the file can be closed.
+    """
+
+    def __init__(self, data, path=None, mapping=None):
+        """
+        :param data: memoryview of the whole file
+        :param path: Path of the mapped file, None for files not on disk
+        :param mapping: mmap backing data, closed with the buffer
+        """
+        self.data = data
+        self.path = path
+        self._mapping = mapping
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.data)
+
+    def open(self):
+        """
+        :return: BufferReader over the contents
+        """
+        return BufferReader(self.data)
+
+    def payload(self):
+        """
+        :return: What an extraction worker needs to open the contents with open_payload():
+                 the path of a mapped file, otherwise the bytes
+        """
+        if self.path is not None:
+            return self.path
+        if isinstance(self.data.obj, bytes) and len(self.data.obj) == len(self.data):
+            return self.data.obj
+
+        return self.data.tobytes()
+
+    def close(self):
+        self.data.release()
+        if self._mapping is not None:
+            self._mapping.close()
+
+
+def _real_file(file):
+    # Django File objects and temporary file wrappers keep the real file in `file`
+    while hasattr(file, 'file'):
+        file = file.file
+
+    return file
+
+
+def _mapped_path(file, fileno):
+    """
+    :return: Absolute path of an open file, None if its name does not lead to the same file
+    """
+    name = getattr(file, 'name', None)
+    if not isinstance(name, str):
+        return None
+
+    try:
+        if os.path.samestat(os.stat(name), os.fstat(fileno)):
+            return os.path.abspath(name)
+    except OSError:
+        pass
+
+    return None
+
+
+def map_file(file):
+    """
+    Maps a file into memory instead of reading it.
+    :param file: Uploaded, stored or open file, or the contents as a bytes-like object
+    :return: FileBuffer of the whole file. Files without a descriptor are viewed in
+             place when they are BytesIO objects and read otherwise.
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        return FileBuffer(memoryview(file))
+
+    real_file = _real_file(file)
+    if isinstance(real_file, io.BytesIO):
+        return FileBuffer(real_file.getbuffer())
+
+    try:
+        fileno = real_file.fileno()
+    except (AttributeError, OSError, ValueError):
+        file.seek(0)
+        return FileBuffer(memoryview(file.read()))
+
+    if not os.fstat(fileno).st_size:
+        # An empty file cannot be mapped
+        return FileBuffer(memoryview(b''))
+
+    mapping = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    return FileBuffer(memoryview(mapping), _mapped_path(real_file, fileno), mapping)
+
+
+@contextmanager
+def open_payload(payload):
+    """
+    Opens a FileBuffer.payload() in another process.
+    :return: BufferReader over the contents
+    """
+    if isinstance(payload, str):
+        # The mapping outlives the descriptor
+        with open(payload, 'rb') as payload_file:
+            buffer = map_file(payload_file)
+    else:
+        buffer = FileBuffer(memoryview(payload))
+
+    with buffer:
+        yield buffer.open()
@@ -1,34 +1,241 @@
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
 import re
-
-import docx2txt
+import time
+import zipfile
+from collections import OrderedDict
+from functools import lru_cache
+from xml.etree.ElementTree import iterparse
 
 from pdfminer.converter import TextConverter
 from pdfminer.layout import LAParams
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
 from io import StringIO
 
 from commonregex import street_address
 
-import datefinder
-import datetime
-
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 
-from elasticsearch import Elasticsearch
+try:
+    from elasticsearch import Elasticsearch
+except ImportError:  # Only required by the 'elasticsearch' lookup backend
+    Elasticsearch = None
 
 import sqlite3
 
-conn = sqlite3.connect('respars.sqlite3')
-skills_list = [s[1] for s in conn.execute("SELECT * FROM SKILLS")]
-ignore_words = [iw[0] for iw in conn.execute("SELECT IgnoreWord FROM ignore_words")]
-conn.close()
-
+from resumeparser.utils import metrics, resources
+from resumeparser.utils.artifact import (Artifact, StringIndex, StringMap, add_hash_index, add_string_map,
+                                         write_artifact)
+from resumeparser.utils.buffers import BufferReader, map_file, open_payload
+from resumeparser.utils.dates import DateIndex
+from resumeparser.utils.gazetteer import CompiledIndex, build_index, compile_index, load_names
+from resumeparser.utils.sandbox import ExtractionError, SandboxPool
+from resumeparser.utils.skillmatcher import CompiledSkillMatcher, build_skill_matcher, compile_matcher
+from resumeparser.utils.tokenizer import TOKENIZER, word_tokenize
 
 logging.basicConfig(level=logging.ERROR)
 
+# Bump whenever a change to this module alters the parsed output
+PARSER_VERSION = '7'
+
+# Dictionaries the parsed output depends on: tables of respars.sqlite3 and files relative to
+# resources.DATA_DIR. The results table parse_resumes writes to is not one of them.
+dictionary_tables = ('companies', 'ignore_words', 'skills', 'universities')
+dictionary_files = (
+    os.path.join('elasticsearch-dump', 'skillsets.json.gz'),
+    os.path.join('elasticsearch-dump', 'universities.json.gz'),
+)
+
+# Pages of a PDF that are read, 0 for all of them
+PDF_MAX_PAGES = int(os.environ.get('RESUMEPARSER_PDF_MAX_PAGES', 0))
+
+# Text is extracted in a pool of EXTRACT_WORKERS processes. A worker is killed when a file
+# takes more than EXTRACT_TIMEOUT seconds, can allocate EXTRACT_MAX_MEMORY megabytes beyond
+# what it inherits and is replaced after EXTRACT_MAX_TASKS files. 0 workers extracts in the
+# calling process, 0 disables a limit. Daemonic processes cannot start workers and always
+# extract in process: SandboxPool workers, which are already under these kinds of limits,
+# and multiprocessing.Pool workers, which are not.
+EXTRACT_WORKERS = int(os.environ.get('RESUMEPARSER_EXTRACT_WORKERS', os.cpu_count()))
+EXTRACT_TIMEOUT = float(os.environ.get('RESUMEPARSER_EXTRACT_TIMEOUT', 60))
+EXTRACT_MAX_MEMORY = int(os.environ.get('RESUMEPARSER_EXTRACT_MAX_MEMORY', 1024))
+EXTRACT_MAX_TASKS = int(os.environ.get('RESUMEPARSER_EXTRACT_MAX_TASKS', 200))
+
+# PDFs with at least this many pages are split into PDF_PARALLEL_WORKERS page ranges
+# extracted in parallel, 0 disables it
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('RESUMEPARSER_PDF_PARALLEL_MIN_PAGES', 20))
+PDF_PARALLEL_WORKERS = int(os.environ.get('RESUMEPARSER_PDF_PARALLEL_WORKERS', os.cpu_count()))
+
+# Where university and company names are looked up: 'elasticsearch' or 'local'
+LOOKUP_BACKEND = os.environ.get('RESUMEPARSER_LOOKUP_BACKEND', 'elasticsearch')
+
+# Elasticsearch doc type and local gazetteer source of every lookup index
+lookup_indices = {
+    'universities': ('university', os.path.join('elasticsearch-dump', 'universities.json.gz')),
+    'companies': ('company', None),
+}
+
+# Elasticsearch nodes and the number of pooled connections kept open to each
+ES_HOSTS = os.environ.get('RESUMEPARSER_ES_HOSTS', 'localhost:9200').split(',')
+ES_MAXSIZE = int(os.environ.get('RESUMEPARSER_ES_MAXSIZE', 10))
+
+# Seconds the version of the Elasticsearch lookup indices is used before it is read again
+ES_VERSION_TTL = float(os.environ.get('RESUMEPARSER_ES_VERSION_TTL', 60))
+
+# Punctuation tokens dropped before matching
+punctuation = ('.', ',', '"', "'", '?', '!', ':', ';', '(', ')', '[', ']', '{', '}')
+
+company_suffixes = ("corporation", "company", "incorporated", "limited", "co", "ltd",
+                    "corp", "inc", "llc", "lc", "llp", "psc", "pllc", "plc")
+
+# Tokens left out of the key company names are compared by
+company_stop_words = frozenset(punctuation + company_suffixes)
+
+# Dictionaries compiled by build_artifact(), used while they match their sources
+ARTIFACT_PATH = os.environ.get('RESUMEPARSER_ARTIFACT', resources.data_path('respars.artifact'))
+
+# Created on first use in each process, after any fork, see _get_es() and _get_extract_pool()
+es_client = None
+extract_pool = None
+# (version, time it was read) of the Elasticsearch lookup indices, see lookup_version()
+es_version = (None, 0)
+
+
+@resources.register('artifact')
+def _load_artifact():
+    if not os.path.exists(ARTIFACT_PATH):
+        return None
+
+    try:
+        artifact = Artifact(ARTIFACT_PATH)
+    except (OSError, ValueError) as e:
+        logging.error('Issue loading parser artifact:: ' + str(e))
+        return None
+
+    if artifact.meta.get('key') != artifact_key():
+        logging.error('Issue loading parser artifact:: %s is out of date, rebuild it with '
+                      'manage.py build_parser_artifact' % ARTIFACT_PATH)
+        return None
+
+    return artifact
+
+
+@resources.register('ignore_words')
+def _load_ignore_words():
+    artifact = resources.get('artifact')
+    if artifact is not None:
+        return StringIndex(artifact, 'ignore_words')
+
+    return _read_ignore_words()
+
+
+def _read_ignore_words():
+    # Along with punctuation, the tokens dropped from lines before looking up companies
+    conn = sqlite3.connect(resources.data_path('respars.sqlite3'))
+    try:
+        return frozenset([iw[0] for iw in conn.execute("SELECT IgnoreWord FROM ignore_words")] + list(punctuation))
+    finally:
+        conn.close()
+
+
+@resources.register('stop_words')
+def _load_stop_words():
+    stop_words = set(stopwords.words('english'))
+    stop_words.update(punctuation)
+    return frozenset(stop_words)
+
+
+@resources.register('punkt', eager=TOKENIZER == 'nltk')
+def _load_punkt():
+    # NLTK's word_tokenize loads and caches the Punkt sentence model on first use
+    word_tokenize('Warm up.')
+    return True
+
+
+def _skill_tokenizer():
+    stop_words = resources.get('stop_words')
+
+    def tokenize(text):
+        return [token.lower() for token in word_tokenize(text) if token not in stop_words]
+
+    return tokenize
+
+
+@resources.register('skill_matcher')
+def _load_skill_matcher():
+    artifact = resources.get('artifact')
+    if artifact is not None:
+        return CompiledSkillMatcher(_skill_tokenizer(), artifact)
+
+    return _build_skill_matcher()
+
+
+def _build_skill_matcher():
+    return build_skill_matcher(_skill_tokenizer(), resources.data_path('respars.sqlite3'),
+                               resources.data_path('elasticsearch-dump', 'skillsets.json.gz'))
+
+
+@resources.register('company_keys')
+def _load_company_keys():
+    artifact = resources.get('artifact')
+    if artifact is not None:
+        return StringMap(artifact, 'company_keys')
+
+    return _build_company_keys()
+
+
+def _build_company_keys():
+    # Keys of the gazetteer companies, so lookup hits are normally never tokenized
+    return {name: company_key(name)
+            for name in load_names(resources.data_path('respars.sqlite3'), 'companies')}
+
+
+def _build_gazetteer(index):
+    dump_path = lookup_indices[index][1]
+    return build_index(resources.data_path('respars.sqlite3'), index,
+                       dump_path and resources.data_path(dump_path))
+
+
+def _register_gazetteer(index):
+
+    @resources.register('gazetteer:' + index, eager=LOOKUP_BACKEND == 'local')
+    def load():
+        artifact = resources.get('artifact')
+        if artifact is not None:
+            return CompiledIndex(artifact, 'gazetteer:' + index)
+
+        return _build_gazetteer(index)
+
+
+for _index in lookup_indices:
+    _register_gazetteer(_index)
+
+
+@resources.register('dictionary_digest')
+def _load_dictionary_digest():
+    digest = hashlib.sha1()
+    conn = sqlite3.connect(resources.data_path('respars.sqlite3'))
+    try:
+        for table in dictionary_tables:
+            for row in conn.execute('SELECT * FROM %s ORDER BY rowid' % table):
+                digest.update(repr(row).encode('utf-8'))
+    finally:
+        conn.close()
+
+    for path in dictionary_files:
+        with open(resources.data_path(path), 'rb') as dictionary:
+            for chunk in iter(lambda: dictionary.read(1 << 16), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()[:16]
+
+
 objective = (
     'career goal',
     'objective',
@@ -141,30 +348,299 @@ accomplishments = (
 )
 
 
-def process(file):
+def process(file, fields=None):
     """
     Main function to process resume file to json.
-    :param file: Resume file
-    :return: resume_data: Parsed resume dictionary
+    :param file: Resume file, or its contents as bytes. The file is mapped, not read, see map_file().
+    :param fields: Names of the fields to extract, all of DEFAULT_FIELDS by default.
+                   Only the stages these fields depend on are run.
+    :return: resume_data: Parsed resume dictionary, None for unsupported files
+    :raises ExtractionError: If text extraction broke a limit of the extraction pool
     """
-    if file.name.endswith('docx'):
-        resume_lines = convert_docx_to_txt(file)
-    elif file.name.endswith('pdf'):
-        resume_lines = convert_pdf_to_txt(file)
-    else:
+    with map_file(file) as buffer:
+        with metrics.timed(metrics.stage_seconds, stage='dispatch'):
+            filetype = file_type(buffer.data)
+        metrics.files.inc(filetype=filetype or 'unsupported')
+        if filetype is None:
+            return None
+
+        stages = resolve_stages(fields or DEFAULT_FIELDS)
+
+        context = {'file': buffer, 'filetype': filetype}
+        with metrics.timed(metrics.parse_seconds, filetype=filetype):
+            try:
+                for name, (extract, requires) in extractors.items():
+                    if name in stages:
+                        with metrics.timed(metrics.stage_seconds, stage=name):
+                            context[name] = extract(context)
+            except ExtractionError as e:
+                metrics.extract_failures.inc(reason=e.code)
+                raise
+
+    resume_data = {name: context[name] for name in STORED_FIELDS if name in stages}
+    if fields:
+        resume_data = select_fields(resume_data, fields)
+
+    return resume_data
+
+
+def file_type(data):
+    """
+    Detects the type of a resume from its contents, whatever its name.
+    :param data: Bytes-like object of the whole file
+    :return: 'pdf', 'docx' or None for unsupported files
+    """
+    # Readers accept the PDF header anywhere in the first kilobyte
+    head = bytes(data[:1024])
+    if b'%PDF-' in head:
+        return 'pdf'
+
+    # A docx file is a zip archive with the document body in word/document.xml
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(BufferReader(data)) as docx:
+                docx.getinfo('word/document.xml')
+            return 'docx'
+        except (zipfile.BadZipfile, KeyError):
+            return None
+
+    return None
+
+
+# Stage name -> (function taking the context dict, names of the stages it needs)
+extractors = OrderedDict()
+
+
+def extractor(name, requires=()):
+    """
+    Registers a pipeline stage. Stages run in registration order, so a stage
+    must be registered after the stages it requires.
+    :param name: Stage name, its result is stored in the context under this name
+    :param requires: Names of the stages whose results the stage reads
+    """
+    def decorator(extract):
+        extractors[name] = (extract, tuple(requires))
+        return extract
+
+    return decorator
+
+
+def resolve_stages(fields):
+    """
+    :param fields: Requested field names
+    :return: Set of the stages needed to produce the fields
+    """
+    pending = []
+    for field in fields:
+        if field in contact_subfields:
+            field = 'contact_info'
+        if field not in extractors:
+            raise ValueError('Unknown field: %s' % field)
+        pending.append(field)
+
+    stages = set()
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            stages.add(name)
+            pending.extend(extractors[name][1])
+
+    return stages
+
+
+def select_fields(resume_data, fields):
+    """
+    Trims parsed resume data to the requested fields.
+    :param resume_data: Parsed resume dictionary with at least the requested fields
+    :param fields: Field names, top level or one of contact_subfields
+    :return: resume_data: Dictionary with only the requested fields
+    """
+    selected = {name: resume_data[name] for name in fields if name in STORED_FIELDS}
+
+    subfields = [name for name in fields if name in contact_subfields]
+    if subfields and 'contact_info' not in selected:
+        contact_info = resume_data['contact_info']
+        selected['contact_info'] = {}
+        for name in subfields:
+            group, key = contact_subfields[name]
+            selected['contact_info'].setdefault(group, {})[key] = contact_info[group][key]
+
+    return selected
+
+
+@extractor('lines')
+def _extract_lines(context):
+    buffer = context['file']
+    with metrics.timed(metrics.extract_seconds, filetype=context['filetype']):
+        if context['filetype'] == 'docx':
+            return read_docx_lines(buffer)
+
+        return read_pdf_lines(buffer)
+
+
+@extractor('segments', requires=('lines',))
+def _extract_segments(context):
+    return segment(context['lines'])
+
+
+@extractor('contact_lines')
+def _extract_contact_lines(context):
+    # Without a full parse read only up to the first heading, often just page one
+    if 'segments' in context:
+        return context['segments']['contact_info']
+
+    return read_contact_lines(context['file'], context['filetype'])
+
+
+@extractor('contact_info', requires=('contact_lines',))
+def _extract_contact_info(context):
+    return get_contact_info({'contact_info': context['contact_lines']})
+
+
+@extractor('education', requires=('segments', 'lines'))
+def _extract_education(context):
+    return extract_edu_info(context['segments'], context['lines'][:])
+
+
+@extractor('degree', requires=('segments', 'lines'))
+def _extract_degree(context):
+    return extract_degree_info(context['segments'], context['lines'][:])
+
+
+@extractor('work_history', requires=('segments', 'lines'))
+def _extract_work_history(context):
+    return extract_company_info(context['segments'], context['lines'][:])
+
+
+@extractor('skills', requires=('segments', 'lines'))
+def _extract_skills(context):
+    return extract_skills(context['segments'], context['lines'][:])
+
+
+@extractor('raw_text', requires=('lines',))
+def _extract_raw_text(context):
+    return '\n'.join(context['lines'])
+
+
+# Fields returned when none are requested
+DEFAULT_FIELDS = ('contact_info', 'education', 'degree', 'work_history', 'skills')
+
+# Fields of a full parse as cached and stored, raw_text is only returned when requested
+STORED_FIELDS = DEFAULT_FIELDS + ('raw_text',)
+
+# Parts of contact_info that can be requested on their own, as (group, key)
+contact_subfields = {
+    'name': ('person_name', 'full_name'),
+    'telephone': ('contact_method', 'telephone'),
+    'email': ('contact_method', 'email'),
+    'address': ('contact_method', 'address'),
+}
+
+
+def _compile_header_pattern():
+    """
+    Builds one anchored alternation over every section vocabulary. Alternatives
+    are tried left to right, so listing them in section priority order and then
+    tuple order reproduces the old first-match-wins semantics of startswith().
+    """
+    headers = []
+    for section, vocabulary in section_headers:
+        for header in vocabulary:
+            header_sections.setdefault(header, section)
+            headers.append(header)
+
+    return re.compile('|'.join(re.escape(h) for h in headers))
+
+
+# Sections in the order they are tried when a line could start more than one
+section_headers = (
+    ('objective', objective),
+    ('work_and_employment', work_and_employment),
+    ('education_and_training', education_and_training),
+    ('skills', skills_header),
+    ('misc', misc),
+    ('accomplishments', accomplishments),
+)
+header_sections = {}
+header_pattern = _compile_header_pattern()
+
+
+def parser_version():
+    """
+    Identifies the parser code, dictionary contents and lookup backend, so results
+    cached under an older version are not served after any of them changes.
+    :return: String of the form '<PARSER_VERSION>:<tokenizer>:<dictionary digest>:<lookup version>',
+             None while the version of the lookup indices is not known
+    """
+    lookup = lookup_version()
+    if lookup is None:
         return None
 
-    resume_segments = segment(resume_lines)
+    return PARSER_VERSION + ':' + TOKENIZER + ':' + resources.get('dictionary_digest') + ':' + lookup
+
+
+def lookup_version():
+    """
+    Identifies where universities and companies are looked up.
+    :return: 'local' for the gazetteers, which are covered by the dictionary digest. Otherwise
+             'es-' and a digest of the uuids of the Elasticsearch indices, which change when
+             an index is recreated, and of their mappings, or None when they cannot be
+             read. Read again after ES_VERSION_TTL seconds.
+    """
+    global es_version
+    if LOOKUP_BACKEND == 'local':
+        return 'local'
+
+    version, read_at = es_version
+    if read_at and time.monotonic() - read_at < ES_VERSION_TTL:
+        return version
+
+    try:
+        indices = _get_es().indices.get(index=','.join(sorted(lookup_indices)))
+        digest = hashlib.sha1()
+        for name in sorted(indices):
+            index = indices[name]
+            digest.update(json.dumps([name, index['settings']['index']['uuid'], index['mappings']],
+                                     sort_keys=True).encode('utf-8'))
+        version = 'es-' + digest.hexdigest()[:8]
+    except Exception as e:
+        logging.error('Issue reading the lookup index versions:: ' + str(e))
+        version = None
+
+    es_version = (version, time.monotonic())
+    return version
+
 
-    resume_data = {
-        'contact_info': get_contact_info(resume_segments),
-        'education': extract_edu_info(resume_segments, resume_lines[:]),
-        'degree': extract_degree_info(resume_segments, resume_lines[:]),
-        'work_history': extract_company_info(resume_segments, resume_lines[:]),
-        'skills': extract_skills(resume_segments, resume_lines[:]),
+def artifact_key():
+    """
+    Identifies everything compiled into the artifact, so a stale artifact is not used.
+    """
+    stop_words = '\n'.join(sorted(resources.get('stop_words')))
+    return {
+        'parser_version': PARSER_VERSION,
+        'tokenizer': TOKENIZER,
+        'dictionary_digest': resources.get('dictionary_digest'),
+        'stop_words': hashlib.sha1(stop_words.encode('utf-8')).hexdigest()[:16],
     }
 
-    return resume_data
+
+def build_artifact(path=None):
+    """
+    Compiles the ignore words, skill trie, gazetteers and company keys into one
+    file that worker processes map instead of loading the dictionaries.
+    :param path: Output file, ARTIFACT_PATH by default
+    :return: path
+    """
+    path = path or ARTIFACT_PATH
+    sections = {}
+    add_hash_index(sections, 'ignore_words', sorted(_read_ignore_words()))
+    compile_matcher(_build_skill_matcher(), sections, 'skills')
+    for index in lookup_indices:
+        compile_index(_build_gazetteer(index), sections, 'gazetteer:' + index)
+    add_string_map(sections, 'company_keys', _build_company_keys())
+
+    write_artifact(path, sections, {'key': artifact_key()})
+    return path
 
 
 def segment(string_to_search):
@@ -177,61 +653,52 @@ def segment(string_to_search):
         'misc': {}
     }
 
-    resume_indices = []
-
-    find_segment_indices(string_to_search, resume_segments, resume_indices)
-    slice_segments(string_to_search, resume_segments, resume_indices)
+    segment_spans = find_segment_spans(string_to_search)
+    slice_segments(string_to_search, resume_segments, segment_spans)
 
-    pretty(resume_segments)
     return resume_segments
 
 
-def find_segment_indices(string_to_search, resume_segments, resume_indices):
+def is_heading(line):
+    """
+    :param line: Resume line
+    :return: The section header the line starts with, or None
+    """
+    if line[0].islower():
+        return None
+
+    result = header_pattern.match(line.lower())
+    if result:
+        return result.group()
+
+    return None
+
+
+def find_segment_spans(string_to_search):
+    """
+    Classifies every line against the section headers in a single pass.
+    :param string_to_search: List of resume lines
+    :return: List of (section, header, start, end) tuples in document order
+    """
+    headings = []
     for i, line in enumerate(string_to_search):
 
-        if line[0].islower():
-            continue
+        header = is_heading(line)
+        if header:
+            headings.append((header_sections[header], header, i))
 
-        header = line.lower()
-        if [o for o in objective if header.startswith(o)]:
-            resume_indices.append(i)
-            header = [o for o in objective if header.startswith(o)][0]
-            resume_segments['objective'][header] = i
-        elif [w for w in work_and_employment if header.startswith(w)]:
-            resume_indices.append(i)
-            header = [w for w in work_and_employment if header.startswith(w)][0]
-            resume_segments['work_and_employment'][header] = i
-        elif [e for e in education_and_training if header.startswith(e)]:
-            resume_indices.append(i)
-            header = [e for e in education_and_training if header.startswith(e)][0]
-            resume_segments['education_and_training'][header] = i
-        elif [s for s in skills_header if header.startswith(s)]:
-            resume_indices.append(i)
-            header = [s for s in skills_header if header.startswith(s)][0]
-            resume_segments['skills'][header] = i
-        elif [m for m in misc if header.startswith(m)]:
-            resume_indices.append(i)
-            header = [m for m in misc if header.startswith(m)][0]
-            resume_segments['misc'][header] = i
-        elif [a for a in accomplishments if header.startswith(a)]:
-            resume_indices.append(i)
-            header = [a for a in accomplishments if header.startswith(a)][0]
-            resume_segments['accomplishments'][header] = i
-
-
-def slice_segments(string_to_search, resume_segments, resume_indices):
-    resume_segments['contact_info'] = string_to_search[:resume_indices[0]]
-
-    for section, value in resume_segments.items():
-        if section == 'contact_info':
-            continue
+    ends = [start for section, header, start in headings[1:]] + [len(string_to_search)]
+    return [(section, header, start, end) for (section, header, start), end in zip(headings, ends)]
 
-        for sub_section, start_idx in value.items():
-            end_idx = len(string_to_search)
-            if (resume_indices.index(start_idx) + 1) != len(resume_indices):
-                end_idx = resume_indices[resume_indices.index(start_idx) + 1]
 
-            resume_segments[section][sub_section] = string_to_search[start_idx:end_idx]
+def slice_segments(string_to_search, resume_segments, segment_spans):
+    if segment_spans:
+        resume_segments['contact_info'] = string_to_search[:segment_spans[0][2]]
+    else:
+        resume_segments['contact_info'] = string_to_search[:]
+
+    for section, header, start_idx, end_idx in segment_spans:
+        resume_segments[section][header] = string_to_search[start_idx:end_idx]
 
 
 def get_contact_info(resume_segments):
@@ -244,28 +711,66 @@ def get_contact_info(resume_segments):
         'person_name': {},
         'contact_method': {}
     }
+    found = scan_contact_info(resume_segments['contact_info'])
+
     # Parse person's name
-    contact_info['person_name']['full_name'] = extract_name(resume_segments)
+    contact_info['person_name']['full_name'] = found.get('full_name', '')
     if contact_info['person_name']['full_name']:
         tokenized_name = contact_info['person_name']['full_name'].split()
         contact_info['person_name']['given_name'] = tokenized_name[0]
         contact_info['person_name']['family_name'] = tokenized_name[-1]
     # Parse contact method
-    contact_info['contact_method']['telephone'] = extract_phone_number(resume_segments)
-    contact_info['contact_method']['email'] = extract_email(resume_segments)
+    contact_info['contact_method']['telephone'] = found.get('telephone')
+    contact_info['contact_method']['email'] = found.get('email')
     contact_info['contact_method']['address'] = {
-        'street_address': extract_address(resume_segments),
-        'state': extract_state(resume_segments),
-        'zipcode': extract_zip(resume_segments)
+        'street_address': found.get('street_address'),
+        'state': found.get('state'),
+        'zipcode': found.get('zipcode')
     }
 
     return contact_info
 
 
+def scan_contact_info(string_to_search):
+    """
+    Finds every contact field in one pass over the lines, stopping as soon as
+    all of them are found. Each field takes its first match, as the
+    individual extract_* functions do.
+    :param string_to_search: List of contact info lines
+    :return: found: Dictionary of field name to value for the fields found
+    """
+    found = {}
+    pending = contact_fields
+    try:
+        for line in string_to_search:
+            for field, match in pending:
+                value = match(line)
+                if value is not None:
+                    found[field] = value
+
+            pending = [(field, match) for field, match in pending if field not in found]
+            if not pending:
+                break
+
+    except Exception as e:
+        logging.error('Issue parsing contact info:: ' + str(e))
+
+    return found
+
+
 def _process_txt(tokens, stop_words):
     return ' '.join([word for word in tokens if word not in stop_words])
 
 
+@lru_cache(maxsize=4096)
+def company_key(name):
+    """
+    :param name: Company name
+    :return: The name lowercased without punctuation or legal suffixes
+    """
+    return _process_txt(word_tokenize(name.lower()), company_stop_words)
+
+
 def _flatten_dict(list_dict):
     list_values = []
     for key, val in list_dict.items():
@@ -275,92 +780,466 @@ def _flatten_dict(list_dict):
     return list_values
 
 
-def _get_date_range(string_to_search, start_idx):
-    resume_len = len(string_to_search)
-    text_to_search = string_to_search[start_idx]
-    if (start_idx + 1) < resume_len:
-        text_to_search = text_to_search + ' ' + string_to_search[start_idx + 1]
-        if (start_idx + 2) < resume_len:
-            text_to_search = text_to_search + ' ' + string_to_search[start_idx + 2]
+def _get_es():
+    global es_client
+    if es_client is None:
+        es_client = Elasticsearch(ES_HOSTS, maxsize=ES_MAXSIZE)
+
+    return es_client
+
+
+def _reset_after_fork():
+    # A forked child would share the connections of its parent's client and the pipes
+    # of its parent's extraction workers, it creates its own on first use
+    global es_client, es_version, extract_pool
+    es_client = None
+    es_version = (None, 0)
+    extract_pool = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
-    # list of dates found
-    dates = list(datefinder.find_dates(text_to_search))
-    # Sanity test for dates
-    dates = [date for date in dates
-             if datetime.datetime(year=1960, month=1,day=1) < date < datetime.datetime.today()]
 
-    return dates
+def _search_lines(index, lines):
+    """
+    Looks up every line in index with one request per index.
+    :param index: Lookup index, 'universities' or 'companies'
+    :param lines: List of strings to match
+    :return: List of name lists, one per line and in the same order
+    """
+    if not lines:
+        return []
+
+    metrics.lookup_requests.inc(index=index, backend=LOOKUP_BACKEND)
+    metrics.lookup_queries.inc(len(lines), index=index, backend=LOOKUP_BACKEND)
+    with metrics.timed(metrics.lookup_seconds, index=index, backend=LOOKUP_BACKEND):
+        return _search_backend(index, lines)
+
+
+def _search_backend(index, lines):
+    if LOOKUP_BACKEND == 'local':
+        gazetteer = resources.get('gazetteer:' + index)
+        return [[name for name, score in gazetteer.search(line)] for line in lines]
+
+    body = []
+    for line in lines:
+        body.append({})
+        body.append({
+            "query": {
+                "match": {
+                    "name": line
+                }
+            }
+        })
+
+    filter_results = _get_es().msearch(body=body, index=index, doc_type=lookup_indices[index][0],
+                                       filter_path=['responses.hits.hits._source.name',
+                                                    'responses.hits.total', 'responses.error'])
+
+    results = []
+    for response in filter_results['responses']:
+        if 'error' in response:
+            metrics.lookup_errors.inc(index=index)
+            logging.error('Issue searching ' + index + ':: ' + str(response['error']))
+
+        hits = response.get('hits', {})
+        if not hits.get('total'):
+            results.append([])
+            continue
+
+        results.append([doc['_source']['name'] for doc in hits['hits']])
+
+    return results
 
 
 def convert_docx_to_txt(docx_file):
     """
-        A utility function to convert a Microsoft docx files to raw text.
+    A utility function to convert a Microsoft docx files to raw text.
+    :param docx_file: docx file with gets uploaded by the user
+    :type docx_file: InMemoryUploadedFile
+    :return: The text lines of the docx file
+    :rtype: list
+    :raises ExtractionError: If the file broke a limit of the extraction pool
+    """
+    with map_file(docx_file) as buffer:
+        return read_docx_lines(buffer)
 
-        This code is largely borrowed from existing solutions, and does not match the style of the rest of this repo.
-        :param docx_file: docx file with gets uploaded by the user
-        :type docx_file: InMemoryUploadedFile
-        :return: The text contents of the docx file
-        :rtype: str
+
+def read_docx_lines(buffer):
+    """
+    convert_docx_to_txt() of a FileBuffer, in the extraction pool.
+    """
+    if not _extract_in_pool():
+        return list(iter_docx_lines(buffer.open()))
+
+    return _get_extract_pool().run(_read_docx_lines, buffer.payload())
+
+
+def _read_docx_lines(payload):
+    with open_payload(payload) as docx_file:
+        return list(iter_docx_lines(docx_file))
+
+
+def _extract_in_pool():
+    # Daemonic processes, such as SandboxPool workers and batch parse workers, cannot start processes
+    return EXTRACT_WORKERS > 0 and not multiprocessing.current_process().daemon
+
+
+def _get_extract_pool():
+    global extract_pool
+    if extract_pool is None:
+        extract_pool = SandboxPool(EXTRACT_WORKERS, timeout=EXTRACT_TIMEOUT,
+                                   max_memory=EXTRACT_MAX_MEMORY * 1024 * 1024, max_tasks=EXTRACT_MAX_TASKS)
+
+    return extract_pool
+
+
+# WordprocessingML elements read by iter_docx_lines()
+w_namespace = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+w_body = w_namespace + 'body'
+w_paragraph = w_namespace + 'p'
+w_text = w_namespace + 't'
+w_tab = w_namespace + 'tab'
+w_breaks = (w_namespace + 'br', w_namespace + 'cr')
+
+
+def iter_docx_lines(docx_file):
     """
+    Yields the lines of the paragraphs and table cells of a docx file while
+    word/document.xml is decompressed and parsed. Headers, footers and images
+    are never read and every finished block is dropped from the parse tree, so
+    memory use does not grow with the document. On an error the lines read so
+    far are kept.
+    :param docx_file: docx file, any seekable file object
+    :return: Generator of lines
+    """
+    text = []
     try:
-        text = docx2txt.process(docx_file)  # Extract text from docx file
-        clean_text = text.replace("\r", "\n").replace("\t", " ")  # Normalize text blob
-        resume_lines = clean_text.splitlines()  # Split text blob into individual lines
-        resume_lines = [line.strip() for line in resume_lines if line.strip()]  # Remove empty strings and whitespaces
+        with zipfile.ZipFile(docx_file) as package, package.open('word/document.xml') as document:
+            body = None
+            depth = 0
+            for event, element in iterparse(document, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if element.tag == w_body:
+                        body, body_depth = element, depth
+                    elif element.tag == w_paragraph:
+                        # Text boxes nest paragraphs, keep their text apart from the outer one
+                        for line in _flush_docx_text(text):
+                            yield line
+                    continue
+
+                depth -= 1
+                if element.tag == w_text:
+                    if element.text:
+                        text.append(element.text)
+                elif element.tag == w_tab:
+                    text.append(' ')
+                elif element.tag in w_breaks:
+                    text.append('\n')
+                elif element.tag == w_paragraph:
+                    for line in _flush_docx_text(text):
+                        yield line
+
+                if body is not None and depth == body_depth:
+                    # A paragraph or table of the body is complete
+                    body.clear()
+
+        for line in _flush_docx_text(text):
+            yield line
+
+    except MemoryError:
+        raise
 
-        return resume_lines
     except Exception as e:
         logging.error('Error in docx file:: ' + str(e))
-        return []
 
 
-def convert_pdf_to_txt(pdf_file):
+def _flush_docx_text(text):
+    """
+    Empties the list of text pieces of a paragraph into lines.
+    """
+    lines = ''.join(text).replace("\r", "\n").splitlines()
+    del text[:]
+
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+# Awkward LaTeX bullet characters
+cid_pattern = re.compile(r"\(cid:\d{0,2}\)")
+
+whitespace_pattern = re.compile(r"\s+")
+
+
+def convert_pdf_to_txt(pdf_file, maxpages=None):
+    """
+    A utility function to convert a machine-readable PDF to raw text, in the
+    extraction pool. Long documents are split into page ranges extracted in
+    parallel, see PDF_PARALLEL_MIN_PAGES.
+    :param pdf_file: PDF file which should be converted
+    :param maxpages: Number of pages to read, 0 for all, defaults to PDF_MAX_PAGES
+    :return: The normalized lines of the pdf
+    :rtype: list
+    :raises ExtractionError: If the file broke a limit of the extraction pool
+    """
+    with map_file(pdf_file) as buffer:
+        return read_pdf_lines(buffer, maxpages)
+
+
+def read_pdf_lines(buffer, maxpages=None):
+    """
+    convert_pdf_to_txt() of a FileBuffer. Workers map the file themselves when
+    it is on disk, see FileBuffer.payload().
+    """
+    if maxpages is None:
+        maxpages = PDF_MAX_PAGES
+
+    if not _extract_in_pool():
+        return list(iter_pdf_lines(buffer.open(), maxpages))
+
+    payload = buffer.payload()
+    pool = _get_extract_pool()
+    # Short documents are read by the task that counts the pages
+    resume_lines, num_pages = pool.run(_read_pdf_lines, payload, maxpages)
+    if resume_lines is not None:
+        return resume_lines
+
+    # Contiguous page ranges, one per worker, reassembled in order
+    workers = min(PDF_PARALLEL_WORKERS, num_pages)
+    bounds = [num_pages * i // workers for i in range(workers + 1)]
+    page_ranges = [set(range(start, end)) for start, end in zip(bounds, bounds[1:])]
+
+    resume_lines = []
+    for lines in pool.map(_convert_pdf_pages, [(payload, pagenos) for pagenos in page_ranges]):
+        resume_lines += lines
+
+    return resume_lines
+
+
+def _read_pdf_lines(payload, maxpages):
     """
-    A utility function to convert a machine-readable PDF to raw text.
+    :return: (lines, None), or (None, number of pages) for a PDF to split into page ranges
+    """
+    with open_payload(payload) as pdf_file:
+        if PDF_PARALLEL_MIN_PAGES and PDF_PARALLEL_WORKERS > 1 and EXTRACT_WORKERS > 1:
+            try:
+                num_pages = count_pdf_pages(pdf_file)
+            except MemoryError:
+                raise
+            except Exception as e:
+                logging.error('Error in pdf file:: ' + str(e))
+                return [], None
+
+            if maxpages:
+                num_pages = min(num_pages, maxpages)
+            if num_pages >= PDF_PARALLEL_MIN_PAGES:
+                return None, num_pages
+            pdf_file.seek(0)
+
+        return list(iter_pdf_lines(pdf_file, maxpages)), None
+
+
+def count_pdf_pages(pdf_file):
+    document = PDFDocument(PDFParser(pdf_file))
+    return resolve1(document.catalog['Pages'])['Count']
+
+
+def _convert_pdf_pages(payload, pagenos):
+    # The page ranges are already clipped to maxpages, which pdfminer would otherwise
+    # compare with absolute page numbers and so cut off every range past the limit
+    with open_payload(payload) as pdf_file:
+        return list(iter_pdf_lines(pdf_file, 0, pagenos=pagenos))
+
+
+def iter_pdf_lines(pdf_file, maxpages=None, pagenos=None):
+    """
+    Yields the normalized lines of a machine-readable PDF one page at a time,
+    so only a single page of text is held in memory and consumers can stop
+    reading early. On an error the lines of the pages read so far are kept.
 
     This code is largely borrowed from existing solutions, and does not match the style of the rest of this repo.
-    :param input_pdf_path: Path to the .pdf file which should be converted
-    :type input_pdf_path: str
-    :return: The text contents of the pdf
-    :rtype: str
+    :param pdf_file: PDF file which should be converted
+    :param maxpages: Number of pages to read, 0 for all, defaults to PDF_MAX_PAGES
+    :param pagenos: Set of zero based page numbers to read, all by default
+    :return: Generator of lines
     """
-    try:
-        # PDFMiner boilerplate
-        rsrcmgr = PDFResourceManager()
-        retstr = StringIO()
-        codec = 'utf-8'
-        laparams = LAParams()
-        device = TextConverter(rsrcmgr, retstr, codec=codec, laparams=laparams)
-        interpreter = PDFPageInterpreter(rsrcmgr, device)
+    if maxpages is None:
+        maxpages = PDF_MAX_PAGES
+
+    # PDFMiner boilerplate
+    rsrcmgr = PDFResourceManager()
+    retstr = StringIO()
+    device = TextConverter(rsrcmgr, retstr, codec='utf-8', laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
 
+    try:
         # Iterate through pages
-        for page in PDFPage.get_pages(pdf_file, set(), maxpages=0, password='',
+        for page in PDFPage.get_pages(pdf_file, pagenos or set(), maxpages=maxpages, password='',
                                       caching=True, check_extractable=True):
             interpreter.process_page(page)
-        device.close()
 
-        # Get full string from PDF
-        full_string = retstr.getvalue()
+            # Take the page text and reset the buffer for the next page
+            page_string = retstr.getvalue()
+            retstr.seek(0)
+            retstr.truncate()
+
+            for line in _normalize_pdf_text(page_string):
+                yield line
+
+    except MemoryError:
+        raise
+
+    except Exception as e:
+        logging.error('Error in pdf file:: ' + str(e))
+
+    finally:
+        device.close()
         retstr.close()
 
-        # Normalize a bit, removing line breaks
-        full_string = full_string.replace("\r", "\n")
-        full_string = full_string.replace("\t", " ")
 
-        # Remove awkward LaTeX bullet characters
-        full_string = re.sub(r"\(cid:\d{0,2}\)", " ", full_string)
+def _normalize_pdf_text(text):
+    # Normalize a bit, removing line breaks
+    text = text.replace("\r", "\n").replace("\t", " ")
+    text = cid_pattern.sub(" ", text)
 
-        # Split text blob into individual lines
-        resume_lines = full_string.splitlines(True)
+    # Split text blob into individual lines, dropping empty strings and whitespaces
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            yield whitespace_pattern.sub(' ', line)
 
-        # Remove empty strings and whitespaces
-        resume_lines = [re.sub('\s+', ' ', line.strip()) for line in resume_lines if line.strip()]
 
-        return resume_lines
+def iter_resume_lines(file, filetype, maxpages=None):
+    """
+    Yields the lines of a resume file, lazily.
+    :param file: Resume file
+    :param filetype: Type of the file, see file_type()
+    :param maxpages: Number of PDF pages to read, 0 for all, defaults to PDF_MAX_PAGES
+    :return: Generator of lines, or None for unsupported file types
+    """
+    if filetype == 'docx':
+        return iter_docx_lines(file)
+    elif filetype == 'pdf':
+        return iter_pdf_lines(file, maxpages)
 
-    except Exception as e:
-        logging.error('Error in pdf file:: ' + str(e))
-        return []
+    return None
+
+
+def read_contact_lines(buffer, filetype):
+    """
+    take_contact_lines() of a resume, in the extraction pool.
+    :param buffer: FileBuffer of the resume file
+    :param filetype: Type of the file, see file_type()
+    :return: List of the lines before the first heading
+    :raises ExtractionError: If the file broke a limit of the extraction pool
+    """
+    if not _extract_in_pool():
+        return take_contact_lines(iter_resume_lines(buffer.open(), filetype))
+
+    return _get_extract_pool().run(_read_contact_lines, buffer.payload(), filetype)
+
+
+def _read_contact_lines(payload, filetype):
+    with open_payload(payload) as resume_file:
+        return take_contact_lines(iter_resume_lines(resume_file, filetype))
+
+
+def take_contact_lines(lines):
+    """
+    Consumes lines up to the first section heading, which is all that contact
+    info extraction needs. Fed from iter_pdf_lines() this usually reads only
+    the first page.
+    :param lines: Iterable of resume lines
+    :return: List of the lines before the first heading
+    """
+    contact_lines = []
+    for line in lines:
+        if is_heading(line):
+            break
+        contact_lines.append(line)
+
+    return contact_lines
+
+
+name_pattern = re.compile(r"^([A-Za-z\u00E9-\u00F8\.-][\s]*)+$")
+
+phone_pattern = re.compile(r"\(?"  # open parenthesis
+                           r"(\d{3})?"  # area code
+                           r"\)?"  # close parenthesis
+                           r"[\s\.-]{0,2}?"  # area code, phone separator
+                           r"(\d{3})"  # 3 digit exchange
+                           r"[\s\.-]{0,2}"  # separator bbetween 3 digit exchange, 4 digit local
+                           r"(\d{4})",  # 4 digit local
+                           re.IGNORECASE)
+
+email_pattern = re.compile(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}", re.IGNORECASE)
+
+states = ['AK', 'AL', 'AR', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'GA', 'HI', 'IA', 'ID',
+          'IL', 'IN', 'KS', 'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MO', 'MS', 'MT', 'NC', 'ND', 'NE',
+          'NH', 'NJ', 'NM', 'NV', 'NY', 'OH', 'OK', 'OR', 'PA', 'PR', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT',
+          'VA', 'VT', 'WA', 'WI', 'WV', 'WY']
+state_pattern = re.compile(r'\b(' + '|'.join(states) + r')\b')
+
+zip_pattern = re.compile(r"[\s-]([0-9]{5})[\s,.]|[\s-]([0-9]{5})$")
+
+
+def _match_name(line):
+    if name_pattern.match(line):
+        return line
+
+
+def _match_phone_number(line):
+    result = phone_pattern.search(line)
+    if result:
+        return "-".join(group for group in result.groups() if group)
+
+
+def _match_email(line):
+    result = email_pattern.search(line)
+    if result:
+        return result.group()
+
+
+def _match_address(line):
+    result = street_address.search(line)
+    if result:
+        return result.group().strip(',')
+
+
+def _match_state(line):
+    result = state_pattern.search(line)
+    if result:
+        return result.group()
+
+
+def _match_zip(line):
+    result = zip_pattern.search(line)
+    if result:
+        return result.group(1) or result.group(2)
+
+
+# Contact info fields and the function matching each one in a single line
+contact_fields = (
+    ('full_name', _match_name),
+    ('telephone', _match_phone_number),
+    ('email', _match_email),
+    ('street_address', _match_address),
+    ('state', _match_state),
+    ('zipcode', _match_zip),
+)
+
+
+def _first_match(string_to_search, match):
+    for line in string_to_search:
+        value = match(line)
+        if value is not None:
+            return value
+
+    return None
 
 
 def extract_name(resume_segments):
@@ -372,15 +1251,7 @@ def extract_name(resume_segments):
        :rtype: str
     """
     try:
-        string_to_search = resume_segments['contact_info']
-        name_pattern = re.compile(r"^([A-Za-z\u00E9-\u00F8\.-][\s]*)+$")
-        name = ''
-        for line in string_to_search:
-            if name_pattern.match(line):
-                name = line
-                break
-
-        return name
+        return _first_match(resume_segments['contact_info'], _match_name) or ''
 
     except Exception as e:
         logging.error('Issue parsing name:: ' + str(e))
@@ -396,23 +1267,7 @@ def extract_phone_number(resume_segments):
         :rtype: str
     """
     try:
-        string_to_search = resume_segments['contact_info']
-        regular_expression = re.compile(r"\(?"  # open parenthesis
-                                        r"(\d{3})?"  # area code
-                                        r"\)?"  # close parenthesis
-                                        r"[\s\.-]{0,2}?"  # area code, phone separator
-                                        r"(\d{3})"  # 3 digit exchange
-                                        r"[\s\.-]{0,2}"  # separator bbetween 3 digit exchange, 4 digit local
-                                        r"(\d{4})",  # 4 digit local
-                                        re.IGNORECASE)
-        for line in string_to_search:
-            result = re.search(regular_expression, line)
-            if result:
-                result_groups = result.groups()
-                phone_no = "-".join(result_groups)
-                return phone_no
-
-        return None
+        return _first_match(resume_segments['contact_info'], _match_phone_number)
     except Exception as e:
         logging.error('Issue parsing phone number:: ' + str(e))
         return None
@@ -427,14 +1282,7 @@ def extract_email(resume_segments):
        :rtype: str
        """
     try:
-        string_to_search = resume_segments['contact_info']
-        email_pattern = re.compile(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}", re.IGNORECASE)
-        for line in string_to_search:
-            result = re.search(email_pattern, line)
-            if result:
-                result_groups = result.group()
-                return result_groups
-
+        return _first_match(resume_segments['contact_info'], _match_email)
     except Exception as e:
         logging.error('Issue parsing email number: ' + str(e))
         return None
@@ -449,12 +1297,7 @@ def extract_address(resume_segments):
        :rtype: str
     """
     try:
-        string_to_search = resume_segments['contact_info']
-        for line in string_to_search:
-            result = re.search(street_address, line)
-            if result:
-                str_addr = result.group().strip(',')
-                return str_addr
+        return _first_match(resume_segments['contact_info'], _match_address)
     except Exception as e:
         logging.error('Issue parsing address:: ' + str(e))
         return None
@@ -469,18 +1312,7 @@ def extract_state(resume_segments):
        :rtype: str
     """
     try:
-        string_to_search = resume_segments['contact_info']
-        states = ['AK', 'AL', 'AR', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'GA', 'HI', 'IA', 'ID',
-                  'IL', 'IN', 'KS', 'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MO', 'MS', 'MT', 'NC', 'ND', 'NE',
-                  'NH', 'NJ', 'NM', 'NV', 'NY', 'OH', 'OK', 'OR', 'PA', 'PR', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT',
-                  'VA', 'VT', 'WA', 'WI', 'WV', 'WY']
-        state_pattern = re.compile(r'\b(' + '|'.join(states) + r')\b')
-        for line in string_to_search:
-            result = state_pattern.search(line)
-            if result:
-               return result.group()
-
-        return None
+        return _first_match(resume_segments['contact_info'], _match_state)
     except Exception as e:
         logging.error('Issue parsing state:: ' + str(e))
         return None
@@ -495,15 +1327,7 @@ def extract_zip(resume_segments):
        :rtype: str
     """
     try:
-        string_to_search = resume_segments['contact_info']
-        for line in string_to_search:
-            result = re.search("[\s-][0-9]{5}[\s,.]|[\s-][0-9]{5}$", line)
-            if result:
-                result_group = result.group()
-                zip_code = re.search(r"[0-9]{5}", result_group).group()
-                return zip_code
-        return None
-
+        return _first_match(resume_segments['contact_info'], _match_zip)
     except Exception as e:
         logging.error('Issue parsing zip:: ' + str(e))
         return None
@@ -511,7 +1335,6 @@ def extract_zip(resume_segments):
 
 def extract_edu_info(resume_segments, string_to_search):
     try:
-        es = Elasticsearch()
         universities = []
         university_words = ('university', 'institute', 'college')
 
@@ -519,28 +1342,14 @@ def extract_edu_info(resume_segments, string_to_search):
         if edu_info:
             string_to_search = _flatten_dict(edu_info)
 
-        for line in string_to_search:
+        lines = [line for line in string_to_search
+                 if [uw for uw in university_words if uw in line.lower()]]
 
-            if not [uw for uw in university_words if uw in line.lower()]:
-                continue
-
-            body = {
-                "query": {
-                    "match": {
-                        "name": line
-                    }
-                }
-            }
-            filter_results = es.search(index='universities', doc_type="university", body=body,
-                                       filter_path=['hits.hits._source.name', 'hits.hits._score', 'hits.total'])
+        for line, university_list in zip(lines, _search_lines('universities', lines)):
 
-            if not filter_results['hits']['total']:
+            if not university_list:
                 continue
 
-            university_list = []
-            for doc in filter_results['hits']['hits']:
-                university_list.append(doc['_source']['name'])
-
             univ_found = [ut for ut in university_list if re.search(ut, line)]
 
             if not univ_found:
@@ -601,19 +1410,16 @@ def extract_degree_info(resume_segments, string_to_search):
 
 def extract_company_info(resume_segments, string_to_search):
     try:
-        es = Elasticsearch()
         companies = []
-        spl_chars = ['.', ',', '"', "'", '?', '!', ':', ';', '(', ')', '[', ']', '{', '}']
-        company_suffixes = ["corporation", "company", "incorporated", "limited", "co", "ltd",
-                            "corp", "inc", "llc", "lc", "llp", "psc", "pllc", "plc"]
-        stop_words = set()
-        stop_words.update(spl_chars)
-        stop_words.update(company_suffixes)
+        ignore_words = resources.get('ignore_words')
+        company_keys = resources.get('company_keys')
 
         work_info = resume_segments['work_and_employment']
         if work_info:
             string_to_search = _flatten_dict(work_info)
 
+        line_indices = []
+        lines = []
         for i, line in enumerate(string_to_search):
 
             # Ignore line if line contains more than 10 words
@@ -621,49 +1427,35 @@ def extract_company_info(resume_segments, string_to_search):
                 continue
 
             # remove punctuation and ignore words from line
-            line = _process_txt(word_tokenize(line.lower()), ignore_words + spl_chars)
+            line_indices.append(i)
+            lines.append(_process_txt(word_tokenize(line.lower()), ignore_words))
 
-            # Elasticsearch query
-            body = {
-                "query": {
-                    "match": {
-                        "name": line
-                    }
-                }
-            }
+        # Parse the dates of the section once, companies look their period up by line
+        date_index = DateIndex(string_to_search)
 
-            # Search elasticsearch companies index
-            filter_results = es.search(index='companies', doc_type="company", body=body,
-                                       filter_path=['hits.hits._source.name', 'hits.hits._score', 'hits.total'])
+        # Search companies index for all lines at once
+        for i, line, company_list in zip(line_indices, lines, _search_lines('companies', lines)):
 
             # Go to next line if no results are found
-            if not filter_results['hits']['total']:
+            if not company_list:
                 continue
 
-            # Convert elasticsearch result to
-            company_list = []
-            for doc in filter_results['hits']['hits']:
-                company_list.append(doc['_source']['name'])
-
             worked_companies = []
+            worked_keys = set()
             for c in company_list:
-                # Split company name into tokens
-                tokenized_c = word_tokenize(c.lower())
                 # Company name without punctuations or suffixes
-                processed_c = _process_txt(tokenized_c, stop_words)
-                company_values = [w['organization'] for w in worked_companies]
+                processed_c = company_keys.get(c)
+                if processed_c is None:
+                    processed_c = company_key(c)
 
                 # Check for duplicates
-                duplicate_c = [w for w in company_values
-                                 if processed_c == _process_txt(
-                                    word_tokenize(w.lower()), stop_words)]
-                if duplicate_c:
+                if processed_c in worked_keys:
                     continue
 
                 # Check company name in line
                 if processed_c in line:
                     # Get the work period
-                    work_period = _get_date_range(string_to_search, i)
+                    work_period = date_index.period(i)
                     # If no work period dismiss company name
                     if not work_period:
                         continue
@@ -674,12 +1466,13 @@ def extract_company_info(resume_segments, string_to_search):
                         'start_date': work_period[0]
                     }
 
-                    # Check for end_date
+                    # Check for end_date, None when the position is current
                     if len(work_period) > 1:
                         company_data['end_date'] = work_period[1]
 
                     # Add company data to worked companies list
                     worked_companies.append(company_data)
+                    worked_keys.add(processed_c)
 
             companies += worked_companies
 
@@ -695,29 +1488,9 @@ def extract_skills(resume_segments, string_to_search):
     if skills_dict:
         string_to_search = _flatten_dict(skills_dict)
 
-    stop_words = set(stopwords.words('english'))
-    stop_words.update(['.', ',', '"', "'", '?', '!', ':', ';', '(', ')', '[', ']', '{', '}'])
-    found_skills = []
-    for line in string_to_search:
-        processed_text = [text.lower() for text in word_tokenize(line) if text not in stop_words]
-        found_skills += [s for s in skills_list if s.lower() in processed_text and s not in found_skills]
-
-    skill_count = {}
-    for skill in found_skills:
-        skill_count[skill] = found_skills.count(skill)
-
-    print("\n===============\n" + str(skill_count) + "\n===============\n")
-    return list(set(found_skills))
-
+    skill_count = resources.get('skill_matcher').count(string_to_search)
 
-def pretty(d, indent=0):
-   # TODO: For debug purpose. Remove before production
-   for key, value in d.items():
-      print('\t' * indent + str(key))
-      if isinstance(value, dict):
-         pretty(value, indent+1)
-      else:
-         print('\t' * (indent+1) + str(value))
+    return list(skill_count)
 
 
 # def print_distance(name, email):
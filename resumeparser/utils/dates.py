@@ -0,0 +1,112 @@
+"""
+Date grammar for the periods listed in resumes.
+
+One compiled pattern recognises the usual resume formats ("Jan 2015",
+"January 5, 2015", "Sept. '15", "05/2016", "05/12/2016", "2016-05", "2014")
+plus open end words such as "Present", in the order they appear in a line.
+"""
+import datetime
+import re
+
+months = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+# Alternatives are tried left to right at each position, so the longer forms come first
+date_pattern = re.compile(
+    r"\b(?P<month_name>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+    r"(?:\s+(?P<name_day>[0-3]?\d)(?:st|nd|rd|th)?)?,?\s*"
+    r"(?:(?P<name_year>(?:19|20)\d{2})|'(?P<name_short_year>\d{2}))(?!\d)"
+    r"|(?<![\d/])(?P<num_month>0?[1-9]|1[0-2])[/.-](?:(?P<num_day>[0-3]?\d)[/.-])?"
+    r"(?P<num_year>(?:19|20)\d{2})(?![\d/])"
+    r"|(?<!\d)(?P<iso_year>(?:19|20)\d{2})-(?P<iso_month>0[1-9]|1[0-2])(?!\d)"
+    r"|(?<!\d)(?P<year>(?:19|20)\d{2})(?!\d)"
+    r"|\b(?P<open_end>present|current|now|to date|till date)\b",
+    re.IGNORECASE)
+
+# Lowest date accepted, anything earlier is more likely a stray number
+EARLIEST = datetime.datetime(year=1960, month=1, day=1)
+
+
+def _to_date(match):
+    """
+    :return: datetime for a date match, None for an open end
+    """
+    groups = match.groupdict()
+    if groups['open_end']:
+        return None
+
+    if groups['month_name']:
+        month = months[groups['month_name'][:3].lower()]
+        day = int(groups['name_day'] or 1)
+        if groups['name_year']:
+            year = int(groups['name_year'])
+        else:
+            year = int(groups['name_short_year'])
+            year += 1900 if year >= 60 else 2000
+    elif groups['num_year']:
+        year, month, day = int(groups['num_year']), int(groups['num_month']), int(groups['num_day'] or 1)
+    elif groups['iso_year']:
+        year, month, day = int(groups['iso_year']), int(groups['iso_month']), 1
+    else:
+        year, month, day = int(groups['year']), 1, 1
+
+    return datetime.datetime(year=year, month=month, day=day)
+
+
+def find_dates(text, latest=None):
+    """
+    :param text: Text to search
+    :param latest: Latest date accepted, today by default
+    :return: List of datetimes in text order, None marks an open end such as "Present"
+    """
+    if latest is None:
+        latest = datetime.datetime.today()
+
+    dates = []
+    for match in date_pattern.finditer(text):
+        try:
+            date = _to_date(match)
+        except ValueError:
+            # Impossible day of month
+            continue
+
+        # Sanity test for dates
+        if date is None or EARLIEST < date < latest:
+            dates.append(date)
+
+    return dates
+
+
+class DateIndex(object):
+    """
+    Dates of every line of a section, parsed once.
+
+    The period of a line is taken from the line and the ones following it,
+    since the dates of a position are often listed below its title.
+    """
+
+    def __init__(self, lines, window=3):
+        """
+        :param lines: Section lines
+        :param window: Number of lines searched for a period, starting at the queried line
+        """
+        latest = datetime.datetime.today()
+        self.window = window
+        self.dates = [find_dates(line, latest) for line in lines]
+
+    def period(self, line_number):
+        """
+        :param line_number: Index of the line in the section
+        :return: List of the start date followed by the end date if there is one, an
+                 end date of None is an open end. Empty when the lines hold no date.
+        """
+        dates = [date for dates in self.dates[line_number:line_number + self.window] for date in dates]
+
+        for i, date in enumerate(dates):
+            if date is not None:
+                return dates[i:i + 2]
+
+        return []
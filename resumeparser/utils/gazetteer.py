@@ -0,0 +1,183 @@
+import array
+import gzip
+import heapq
+import json
+import math
+import re
+import sqlite3
+from collections import defaultdict
+from functools import lru_cache
+
+from resumeparser.utils.artifact import StringIndex, StringTable, add_hash_index, add_strings
+
+# Roughly the Elasticsearch standard analyzer: lowercased unicode word runs
+token_pattern = re.compile(r"\w+", re.UNICODE)
+
+
+def analyze(text):
+    return [token.lower() for token in token_pattern.findall(text)]
+
+
+class InvertedIndex(object):
+    """
+    In-process replacement for an Elasticsearch `match` query on a name field.
+
+    Terms of the query are OR-ed together and documents are ranked with BM25
+    using the same defaults as Elasticsearch 5 (k1=1.2, b=0.75).
+    """
+
+    def __init__(self, names, k1=1.2, b=0.75):
+        """
+        :param names: Iterable of document names, duplicates are dropped
+        :param k1: BM25 term frequency saturation
+        :param b: BM25 length normalization
+        """
+        self.names = []
+        self._postings = defaultdict(list)
+        lengths = []
+
+        seen = set()
+        for name in names:
+            if not name or name in seen:
+                continue
+            seen.add(name)
+
+            doc_id = len(self.names)
+            self.names.append(name)
+            terms = analyze(name)
+            lengths.append(len(terms))
+
+            term_freqs = defaultdict(int)
+            for term in terms:
+                term_freqs[term] += 1
+            for term, tf in term_freqs.items():
+                self._postings[term].append((doc_id, tf))
+
+        num_docs = len(self.names)
+        avg_len = float(sum(lengths)) / num_docs if num_docs else 1.0
+
+        # Precompute per document length normalization and per term idf
+        self._norms = [k1 * (1 - b + b * length / avg_len) for length in lengths]
+        self._idf = {term: math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                     for term, postings in self._postings.items()}
+        self._k1 = k1
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, text, size=10):
+        """
+        Rank names against free text.
+        :param text: Query text, e.g. a resume line
+        :param size: Maximum number of hits, same default as Elasticsearch
+        :return: List of (name, score) tuples, best first
+        """
+        scores = defaultdict(float)
+        for term in analyze(text):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = self._idf[term]
+            for doc_id, tf in postings:
+                scores[doc_id] += idf * tf * (self._k1 + 1) / (tf + self._norms[doc_id])
+
+        best = heapq.nlargest(size, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+        return [(self.names[doc_id], score) for doc_id, score in best]
+
+
+def compile_index(index, sections, name):
+    """
+    Adds an InvertedIndex to artifact sections, see CompiledIndex.
+    :param index: InvertedIndex
+    :param sections: Dict of artifact sections to add to
+    :param name: Section name prefix
+    """
+    terms = sorted(index._postings)
+    first = array.array('I', [0])
+    docs = array.array('I')
+    tfs = array.array('I')
+    for term in terms:
+        for doc_id, tf in index._postings[term]:
+            docs.append(doc_id)
+            tfs.append(tf)
+        first.append(len(docs))
+
+    add_strings(sections, name + '.names', index.names)
+    add_hash_index(sections, name + '.terms', terms)
+    sections[name + '.first'] = first
+    sections[name + '.docs'] = docs
+    sections[name + '.tfs'] = tfs
+    sections[name + '.idf'] = array.array('d', [index._idf[term] for term in terms])
+    sections[name + '.norms'] = array.array('d', index._norms)
+    sections[name + '.k1'] = array.array('d', [index._k1])
+
+
+class CompiledIndex(InvertedIndex):
+    """
+    InvertedIndex reading its postings from a memory mapped artifact. Scores
+    are computed the same way, so results are identical.
+    """
+
+    def __init__(self, artifact, name):
+        """
+        :param artifact: Artifact holding the sections added by compile_index()
+        :param name: Section name prefix
+        """
+        self.names = StringTable(artifact, name + '.names')
+        self._terms = StringIndex(artifact, name + '.terms')
+        self._first = artifact.section(name + '.first')
+        self._docs = artifact.section(name + '.docs')
+        self._tfs = artifact.section(name + '.tfs')
+        self._idf = artifact.section(name + '.idf')
+        self._norms = artifact.section(name + '.norms')
+        self._k1 = artifact.section(name + '.k1')[0]
+        self._term_id = lru_cache(maxsize=65536)(self._terms.index)
+
+    def search(self, text, size=10):
+        docs, tfs, norms, k1 = self._docs, self._tfs, self._norms, self._k1
+        scores = defaultdict(float)
+        for term in analyze(text):
+            term_id = self._term_id(term)
+            if term_id < 0:
+                continue
+
+            idf = self._idf[term_id]
+            for posting in range(self._first[term_id], self._first[term_id + 1]):
+                doc_id, tf = docs[posting], tfs[posting]
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norms[doc_id])
+
+        best = heapq.nlargest(size, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+        return [(self.names[doc_id], score) for doc_id, score in best]
+
+
+def load_names(db_path, table, dump_path=None):
+    """
+    Read the names of a gazetteer table and, if given, an Elasticsearch dump.
+    :param db_path: Path to respars.sqlite3
+    :param table: Table with a `name` column, e.g. universities or companies
+    :param dump_path: Path to a *.json.gz dump whose documents have a `name`, optional
+    :return: List of names
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        names = [n[0] for n in conn.execute("SELECT name FROM %s" % table)]
+    finally:
+        conn.close()
+
+    if dump_path:
+        with gzip.open(dump_path, 'rt') as dump:
+            names += [json.loads(line)['_source']['name'] for line in dump]
+
+    return names
+
+
+def build_index(db_path, table, dump_path=None):
+    """
+    Build an InvertedIndex over a gazetteer table.
+    :param db_path: Path to respars.sqlite3
+    :param table: Table with a `name` column, e.g. universities or companies
+    :param dump_path: Path to a *.json.gz dump whose documents have a `name`, optional
+    :return: InvertedIndex
+    """
+    return InvertedIndex(load_names(db_path, table, dump_path))
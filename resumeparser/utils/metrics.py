@@ -0,0 +1,275 @@
+"""
+Counters and histograms exposed in the Prometheus text format.
+
+Values are kept per process. Under a preforking server, or with parses run in
+pool processes, set METRICS_DIR: every process then writes its values to its
+own file there and render() adds up the files of all processes, so a scrape
+sees the same totals whichever worker answers it.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Directory of the per process files, empty to report the values of the scraped process
+# only. Files of exited processes are kept so counters do not go back, clear the directory
+# when the server starts. Processes write their values at most every FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('RESUMEPARSER_METRICS_DIR', '')
+FLUSH_INTERVAL = float(os.environ.get('RESUMEPARSER_METRICS_FLUSH_INTERVAL', 1))
+
+# Seconds, from sub-millisecond stages up to long PDFs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+registry = OrderedDict()
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+# Values changed since they were last written to METRICS_DIR
+_dirty = False
+# File of this process in METRICS_DIR and the thread writing it, replaced in forked children
+_path = None
+_flusher = None
+
+
+def _changed():
+    # Called with _lock held
+    global _dirty, _flusher
+    _dirty = True
+    if METRICS_DIR and _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+        _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError as e:
+            logging.error('Issue writing metrics:: ' + str(e))
+
+
+def flush():
+    """
+    Writes the values of this process to its file in METRICS_DIR if they changed.
+    Call it before a process may exit without running atexit handlers.
+    """
+    global _dirty, _path
+    if not METRICS_DIR:
+        return
+
+    with _flush_lock:
+        with _lock:
+            if not _dirty:
+                return
+            values = {metric.name: metric.dump() for metric in registry.values()}
+            _dirty = False
+
+        if _path is None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            _path = os.path.join(METRICS_DIR, '%d-%s.json' % (os.getpid(), uuid.uuid4().hex[:8]))
+        with open(_path + '.tmp', 'w') as output:
+            json.dump(values, output)
+        os.replace(_path + '.tmp', _path)
+
+
+def _reset_after_fork():
+    # A forked child starts from zero, its parent keeps counting what it inherited.
+    # The locks may have been held by another thread of the parent.
+    global _lock, _flush_lock, _dirty, _path, _flusher
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    for metric in registry.values():
+        metric._values = {}
+    _dirty = False
+    _path = None
+    _flusher = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except OSError as e:
+        logging.error('Issue writing metrics:: ' + str(e))
+
+
+def _read_values():
+    """
+    :return: Dictionary of metric name to the values of all processes in METRICS_DIR, added up
+    """
+    totals = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        try:
+            with open(path) as values_file:
+                values = json.load(values_file)
+        except (OSError, ValueError) as e:
+            logging.error('Issue reading metrics:: ' + str(e))
+            continue
+
+        for name, entries in values.items():
+            if name in registry:
+                registry[name].add(totals.setdefault(name, {}), entries)
+
+    return totals
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+
+    return '{' + ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+                                                     .replace('\n', '\\n'))
+                          for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value))
+
+
+class Counter(object):
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        registry[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            _changed()
+
+    def dump(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def add(self, values, entries):
+        for key, value in entries:
+            key = tuple(key)
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values=None):
+        """
+        :param values: Values to report instead of the ones of this process
+        """
+        if values is None:
+            with _lock:
+                values = dict(self._values)
+
+        for key, value in sorted(values.items()):
+            yield self.name + '_total', _format_labels(self.labelnames, key), value
+
+
+class Histogram(object):
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        # Label values -> [per bucket counts, sum]
+        self._values = {}
+        registry[name] = self
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0])
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            _changed()
+
+    def dump(self):
+        return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+    def add(self, values, entries):
+        for key, counts, total in entries:
+            if len(counts) != len(self.buckets):
+                # Written with other buckets by an older version
+                continue
+            entry = values.setdefault(tuple(key), [[0] * len(self.buckets), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+
+    def samples(self, values=None):
+        """
+        :param values: Values to report instead of the ones of this process
+        """
+        if values is None:
+            with _lock:
+                values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield self.name + '_bucket', _format_labels(self.labelnames, key, [('le', _format_value(bound))]), \
+                    cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, key), total
+            yield self.name + '_count', _format_labels(self.labelnames, key), cumulative
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """
+    Observes the wall time of the block in histogram, also when it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def render():
+    """
+    :return: Every registered metric in the Prometheus text exposition format, the
+             totals of all processes when METRICS_DIR is set
+    """
+    totals = None
+    if METRICS_DIR:
+        flush()
+        totals = _read_values()
+
+    lines = []
+    for metric in list(registry.values()):
+        lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+        lines.append('# TYPE %s %s' % (metric.name, metric.type))
+        values = None if totals is None else totals.get(metric.name, {})
+        for name, labels, value in metric.samples(values):
+            lines.append('%s%s %s' % (name, labels, _format_value(value)))
+
+    return '\n'.join(lines) + '\n'
+
+
+parse_seconds = Histogram('resumeparser_parse_seconds', 'Time to parse one resume.', ['filetype'])
+files = Counter('resumeparser_files', 'Resumes received by file type.', ['filetype'])
+stage_seconds = Histogram('resumeparser_stage_seconds', 'Time spent in each pipeline stage.', ['stage'])
+extract_seconds = Histogram('resumeparser_extract_seconds', 'Time to extract text lines from a file.',
+                            ['filetype'])
+lookup_seconds = Histogram('resumeparser_lookup_seconds', 'Time of one batched gazetteer lookup.',
+                           ['index', 'backend'])
+lookup_requests = Counter('resumeparser_lookup_requests', 'Batched gazetteer lookups.', ['index', 'backend'])
+lookup_queries = Counter('resumeparser_lookup_queries', 'Lines looked up in a gazetteer.', ['index', 'backend'])
+lookup_errors = Counter('resumeparser_lookup_errors', 'Lookup queries answered with an error.', ['index'])
+extract_failures = Counter('resumeparser_extract_failures', 'Files whose text extraction was stopped.', ['reason'])
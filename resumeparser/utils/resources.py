@@ -0,0 +1,68 @@
+"""
+Registry of the dictionaries, gazetteers and models the parser depends on.
+
+Every resource is loaded at most once per process. warm() loads the eager ones
+up front, which should happen in the master process before the web server
+forks its workers so that they share the loaded objects copy-on-write.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+# Directory holding respars.sqlite3 and elasticsearch-dump/, the repository root by default
+DATA_DIR = os.environ.get(
+    'RESUMEPARSER_DATA_DIR',
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+loaders = OrderedDict()
+resources = {}
+_lock = threading.RLock()
+
+
+def data_path(*parts):
+    return os.path.join(DATA_DIR, *parts)
+
+
+def register(name, eager=True):
+    """
+    Decorator registering a zero argument loader function for a resource.
+    :param name: Resource name passed to get()
+    :param eager: Whether warm() loads the resource
+    """
+    def decorator(loader):
+        loaders[name] = (loader, eager)
+        return loader
+
+    return decorator
+
+
+def get(name):
+    """
+    Returns a resource, loading it on first use.
+    :param name: Registered resource name
+    """
+    try:
+        return resources[name]
+    except KeyError:
+        pass
+
+    with _lock:
+        if name not in resources:
+            resources[name] = loaders[name][0]()
+        return resources[name]
+
+
+def warm():
+    """
+    Loads every eager resource.
+    :return: List of the names loaded
+    """
+    names = [name for name, (loader, eager) in loaders.items() if eager]
+    for name in names:
+        get(name)
+
+    return names
+
+
+def is_ready():
+    return all(name in resources for name, (loader, eager) in loaders.items() if eager)
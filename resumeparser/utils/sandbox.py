@@ -0,0 +1,255 @@
+"""
+Worker processes that run text extraction under hard limits.
+
+Malformed or adversarial files can make pdfminer spin for minutes or allocate
+gigabytes, which no except clause catches. Tasks run in worker processes that
+are killed when they exceed a wall clock timeout, that have their address
+space capped, and that are replaced after a number of tasks so memory leaked
+by the parsers is given back. The caller gets an ExtractionError with a code
+instead of losing its own process, and only the worker that held the bad
+file is lost.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the memory limit is not applied there
+    resource = None
+
+# ExtractionError codes
+TIMEOUT = 'timeout'
+TOO_LARGE = 'too_large'
+CRASHED = 'crashed'
+FAILED = 'failed'
+
+
+class ExtractionError(Exception):
+    """
+    A task was stopped, code is one of TIMEOUT, TOO_LARGE, CRASHED or FAILED.
+    """
+
+    def __init__(self, code, message):
+        super(ExtractionError, self).__init__(message)
+        self.code = code
+
+    def __reduce__(self):
+        # Raised again in the parent of process pools, which unpickles it
+        return ExtractionError, (self.code, str(self))
+
+
+def _address_space():
+    """
+    :return: Virtual memory size of this process in bytes, 0 if unknown
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _limit_memory(max_memory):
+    # A forked worker already maps the parent's heap, so the limit is headroom above it
+    limit = _address_space() + max_memory
+    try:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (OSError, ValueError) as e:
+        logging.error('Issue limiting worker memory:: ' + str(e))
+
+
+def _worker_main(conn, max_memory):
+    if max_memory and resource is not None:
+        _limit_memory(max_memory)
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+
+        func, args = task
+        try:
+            reply = ('ok', func(*args))
+        except MemoryError:
+            reply = ('error', TOO_LARGE, 'Extraction exceeded the memory limit')
+        except Exception as e:
+            reply = ('error', FAILED, 'Extraction failed: ' + str(e))
+
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send(('error', TOO_LARGE, 'Extraction result exceeded the memory limit'))
+
+
+class _Worker(object):
+
+    def __init__(self, max_memory):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_main, args=(child_conn, max_memory), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool(object):
+    """
+    Pool of worker processes started on demand, safe to share between threads.
+    """
+
+    def __init__(self, workers, timeout=0, max_memory=0, max_tasks=0):
+        """
+        :param workers: Maximum number of worker processes
+        :param timeout: Seconds a task may run before its worker is killed, 0 for no limit
+        :param max_memory: Bytes a worker may allocate beyond what it inherits, 0 for no limit
+        :param max_tasks: Tasks run by a worker before it is replaced, 0 for no limit
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.max_tasks = max_tasks
+        self._idle = []
+        self._started = 0
+        self._condition = threading.Condition()
+
+    def _acquire(self, block):
+        """
+        :param block: Wait for a worker when all of them are busy
+        :return: An idle or new worker, None if none is free and block is false
+        """
+        with self._condition:
+            while not self._idle and self._started >= self.workers:
+                if not block:
+                    return None
+                self._condition.wait()
+
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+
+        try:
+            return _Worker(self.max_memory)
+        except BaseException:
+            self._discard(None)
+            raise
+
+    def _release(self, worker):
+        if self.max_tasks and worker.tasks >= self.max_tasks:
+            worker.stop()
+            self._discard(None)
+            return
+
+        with self._condition:
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self, worker):
+        if worker is not None:
+            worker.kill()
+
+        with self._condition:
+            self._started -= 1
+            self._condition.notify()
+
+    def run(self, func, *args):
+        """
+        Runs func(*args) in a worker.
+        :param func: Module level function, it is pickled by reference
+        :return: The return value of func
+        :raises ExtractionError: If the task broke a limit, crashed its worker or raised
+        """
+        return self.map(func, [args])[0]
+
+    def map(self, func, args_list):
+        """
+        Runs func once per argument tuple, in parallel on free workers. When one
+        task fails the others are stopped, since they are parts of the same file.
+        :param func: Module level function, it is pickled by reference
+        :param args_list: List of argument tuples
+        :return: List of the return values, in the order of args_list
+        :raises ExtractionError: For the first task that broke a limit, crashed its worker or raised
+        """
+        results = [None] * len(args_list)
+        pending = list(enumerate(args_list))
+        # Connection -> (worker, index, deadline)
+        running = {}
+
+        try:
+            while pending or running:
+                # Wait for a worker only when none is running a task of this call
+                while pending:
+                    worker = self._acquire(block=not running)
+                    if worker is None:
+                        break
+
+                    index, args = pending.pop(0)
+                    try:
+                        worker.conn.send((func, args))
+                    except OSError as e:
+                        self._discard(worker)
+                        raise ExtractionError(CRASHED, 'Extraction worker is gone: ' + str(e))
+                    worker.tasks += 1
+                    deadline = time.monotonic() + self.timeout if self.timeout else None
+                    running[worker.conn] = (worker, index, deadline)
+
+                deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+                wait_time = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+
+                for conn in wait(list(running), wait_time):
+                    worker, index, _ = running.pop(conn)
+                    try:
+                        reply = conn.recv()
+                    except (EOFError, OSError):
+                        self._discard(worker)
+                        raise ExtractionError(CRASHED, 'Extraction worker exited with code %s'
+                                              % worker.process.exitcode)
+
+                    if reply[0] == 'ok':
+                        results[index] = reply[1]
+                        self._release(worker)
+                        continue
+
+                    _, code, message = reply
+                    # A worker that ran out of memory may be left in a bad state
+                    if code == TOO_LARGE:
+                        self._discard(worker)
+                    else:
+                        self._release(worker)
+                    raise ExtractionError(code, message)
+
+                now = time.monotonic()
+                for conn, (worker, index, deadline) in list(running.items()):
+                    if deadline is not None and deadline <= now:
+                        del running[conn]
+                        self._discard(worker)
+                        raise ExtractionError(TIMEOUT, 'Extraction took longer than %g seconds' % self.timeout)
+
+        except BaseException:
+            for worker, _, _ in running.values():
+                self._discard(worker)
+            raise
+
+        return results
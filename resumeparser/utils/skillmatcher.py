@@ -0,0 +1,308 @@
+import array
+import gzip
+import json
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+
+from resumeparser.utils.artifact import StringIndex, StringTable, add_hash_index, add_strings
+
+# Marks a trie node that completes a skill phrase. Tokens are never None.
+_END = None
+# Marks a node whose phrase is the canonical name of its skill, not an alias. Tokens are strings.
+_NAME = ()
+
+
+class SkillMatcher(object):
+    """
+    Token trie over every skill name and alias.
+
+    Phrases are tokenized with the same function that is later applied to the
+    resume text, so multi-word skills ("Database Administration") and symbol
+    heavy ones ("C++", ".NET 3.5") match exactly the way the text is split.
+    """
+
+    def __init__(self, tokenize):
+        """
+        :param tokenize: Callable turning a string into a list of normalized tokens
+        """
+        self.tokenize = tokenize
+        self._root = {}
+        self._start = self._root
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, phrase, skill):
+        """
+        Register a phrase which, when found in the text, counts as skill.
+        :param phrase: Skill name or alias as written in the dictionary
+        :param skill: Canonical skill name reported for the phrase
+        """
+        tokens = self.tokenize(phrase)
+        if not tokens:
+            return
+
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+
+        # First registration wins so that canonical names shadow aliases.
+        if _END not in node:
+            node[_END] = skill
+            if phrase == skill:
+                node[_NAME] = True
+            self._size += 1
+
+    def _step(self, node, token):
+        return node.get(token)
+
+    def _name(self, node):
+        return node[_END] if _NAME in node else None
+
+    def _nested_names(self, tokens, start, end, skill):
+        """
+        Canonical skill names inside a match, such as "Oracle" in "Oracle Access Manager".
+        :return: List of the names other than skill in text order
+        """
+        names = []
+        for k in range(start, end):
+            node = self._start
+            for j in range(k, end):
+                node = self._step(node, tokens[j])
+                if node is None:
+                    break
+                name = self._name(node)
+                if name is not None and name != skill and name not in names:
+                    names.append(name)
+
+        return names
+
+    def find(self, tokens):
+        """
+        Leftmost-longest scan of a token list. The canonical names of other skills
+        inside a match count too, aliases inside it do not.
+        :param tokens: List of normalized tokens
+        :return: Generator of canonical skill names, one per occurrence
+        """
+        root = self._root
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+
+            match, match_end = node.get(_END), i + 1
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    match, match_end = node[_END], j
+
+            if match is None:
+                i += 1
+            else:
+                yield match
+                if match_end > i + 1:
+                    for name in self._nested_names(tokens, i, match_end, match):
+                        yield name
+                i = match_end
+
+    def count(self, lines):
+        """
+        Count skill occurrences over lines of text in a single pass.
+        :param lines: Iterable of strings
+        :return: Counter mapping canonical skill name to number of occurrences
+        """
+        skill_count = Counter()
+        for line in lines:
+            skill_count.update(self.find(self.tokenize(line)))
+
+        return skill_count
+
+
+def _edge_slot(node, token_id, mask):
+    h = (node * 0x9E3779B1 + token_id * 0x85EBCA77) & 0xFFFFFFFF
+    return (h ^ (h >> 15)) & mask
+
+
+def compile_matcher(matcher, sections, name='skills'):
+    """
+    Adds the trie of a SkillMatcher to artifact sections, see CompiledSkillMatcher.
+    :param matcher: SkillMatcher
+    :param sections: Dict of artifact sections to add to
+    :param name: Section name prefix
+    """
+    token_ids = {}
+    skill_ids = {}
+    values = array.array('I')
+    edges = []
+
+    # Number the nodes breadth first, the root is node 0. The value of a node is
+    # (skill id + 1) << 1, plus 1 for a canonical name.
+    nodes = [matcher._root]
+    for node_id, node in enumerate(nodes):
+        value = 0
+        for token, child in node.items():
+            if token is _END:
+                value |= (skill_ids.setdefault(child, len(skill_ids)) + 1) << 1
+            elif token is _NAME:
+                value |= 1
+            else:
+                edges.append((node_id, token_ids.setdefault(token, len(token_ids)), len(nodes)))
+                nodes.append(child)
+        values.append(value)
+
+    size = 1
+    while size < 2 * len(edges) + 1:
+        size *= 2
+
+    # Edge (node, token) -> child, slots hold the key + 1 so that 0 marks an empty slot
+    edge_keys = array.array('Q', [0]) * size
+    edge_children = array.array('I', [0]) * size
+    for parent, token_id, child_id in edges:
+        slot = _edge_slot(parent, token_id, size - 1)
+        while edge_keys[slot]:
+            slot = (slot + 1) & (size - 1)
+        edge_keys[slot] = (parent << 32 | token_id) + 1
+        edge_children[slot] = child_id
+
+    add_hash_index(sections, name + '.tokens', sorted(token_ids, key=token_ids.get))
+    add_strings(sections, name + '.skills', sorted(skill_ids, key=skill_ids.get))
+    sections[name + '.values'] = values
+    sections[name + '.edge_keys'] = edge_keys
+    sections[name + '.edge_children'] = edge_children
+
+
+class CompiledSkillMatcher(SkillMatcher):
+    """
+    SkillMatcher reading its trie from a memory mapped artifact.
+    """
+
+    def __init__(self, tokenize, artifact, name='skills'):
+        """
+        :param tokenize: The tokenize function the matcher was compiled with
+        :param artifact: Artifact holding the sections added by compile_matcher()
+        :param name: Section name prefix
+        """
+        self.tokenize = tokenize
+        self._tokens = StringIndex(artifact, name + '.tokens')
+        self._skills = StringTable(artifact, name + '.skills')
+        self._values = artifact.section(name + '.values')
+        self._edge_keys = artifact.section(name + '.edge_keys')
+        self._edge_children = artifact.section(name + '.edge_children')
+        self._mask = len(self._edge_keys) - 1
+        self._start = 0
+        # Resume text repeats the same few thousand tokens
+        self._token_id = lru_cache(maxsize=65536)(self._tokens.index)
+
+    def __len__(self):
+        return sum(1 for value in self._values if value)
+
+    def add(self, phrase, skill):
+        raise TypeError('Compiled skill matchers are read only')
+
+    def _child(self, node, token_id):
+        key = (node << 32 | token_id) + 1
+        edge_keys = self._edge_keys
+        slot = _edge_slot(node, token_id, self._mask)
+        while edge_keys[slot]:
+            if edge_keys[slot] == key:
+                return self._edge_children[slot]
+            slot = (slot + 1) & self._mask
+
+        return None
+
+    def _step(self, node, token):
+        token_id = self._token_id(token)
+        if token_id < 0:
+            return None
+
+        return self._child(node, token_id)
+
+    def _name(self, node):
+        value = self._values[node]
+        return self._skills[(value >> 1) - 1] if value & 1 else None
+
+    def find(self, tokens):
+        values = self._values
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = self._step(0, tokens[i])
+            if node is None:
+                i += 1
+                continue
+
+            match, match_end = values[node], i + 1
+            j = i + 1
+            while j < n:
+                node = self._step(node, tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if values[node]:
+                    match, match_end = values[node], j
+
+            if not match:
+                i += 1
+            else:
+                skill = self._skills[(match >> 1) - 1]
+                yield skill
+                if match_end > i + 1:
+                    for name in self._nested_names(tokens, i, match_end, skill):
+                        yield name
+                i = match_end
+
+
+def load_skill_entries(db_path, dump_path=None):
+    """
+    Read (phrase, canonical skill) pairs from the skills table and, if given,
+    the Elasticsearch skillsets dump.
+    :param db_path: Path to respars.sqlite3
+    :param dump_path: Path to skillsets.json.gz, optional
+    :return: List of (phrase, skill) tuples, canonical names first
+    """
+    names = []
+    aliases = []
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, alias in conn.execute("SELECT name, alias FROM skills"):
+            names.append((name, name))
+            for a in (alias or '').split(';'):
+                if a.strip():
+                    aliases.append((a.strip(), name))
+    finally:
+        conn.close()
+
+    if dump_path:
+        with gzip.open(dump_path, 'rt') as dump:
+            for line in dump:
+                doc = json.loads(line)['_source']
+                names.append((doc['skill'], doc['skill']))
+                for a in doc.get('skill_alias', []):
+                    aliases.append((a, doc['skill']))
+
+    return names + aliases
+
+
+def build_skill_matcher(tokenize, db_path, dump_path=None):
+    """
+    Build a SkillMatcher from the skill dictionaries.
+    :param tokenize: Callable turning a string into a list of normalized tokens
+    :param db_path: Path to respars.sqlite3
+    :param dump_path: Path to skillsets.json.gz, optional
+    :return: SkillMatcher
+    """
+    matcher = SkillMatcher(tokenize)
+    for phrase, skill in load_skill_entries(db_path, dump_path):
+        matcher.add(phrase, skill)
+
+    return matcher
@@ -0,0 +1,404 @@
+import datetime
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+
+from resumeparser.utils import cvparser, metrics, resources
+from resumeparser.utils.artifact import Artifact, write_artifact
+from resumeparser.utils.buffers import map_file
+from resumeparser.utils.dates import DateIndex, find_dates
+from resumeparser.utils.sandbox import ExtractionError, SandboxPool
+from resumeparser.utils.skillmatcher import CompiledSkillMatcher, SkillMatcher, build_skill_matcher, compile_matcher
+from resumeparser.utils.tokenizer import nltk_tokenize, regex_tokenize
+
+
+def _has_nltk_data():
+    try:
+        nltk_tokenize('Test sentence. Another one.')
+        cvparser.stopwords.words('english')
+    except LookupError:
+        return False
+
+    return True
+
+
+has_nltk_data = _has_nltk_data()
+
+sample_work_history = [
+    'PROFESSIONAL EXPERIENCE',
+    'Dominion Resources Inc., Richmond, VA',
+    'Senior Data Engineer  Jan 2015 - Present',
+    'Built Spark and Hadoop pipelines. Maintained the Oracle data warehouse.',
+    'Oracle Corp',
+    'Java Developer  Jun 2010 - Dec 2014',
+    "Wrote C#, ASP.NET and .NET services; migrated the team's reports to SSRS.",
+    'Best Buy Co., Inc. 2008-2010',
+    'Sales associate, later team lead (2009).',
+    'J.P. Morgan Chase & Co.',
+    'Analyst 05/2006 - 07/2008',
+    "Performed R&D on C++ trading tools; didn't own production support.",
+]
+
+sample_skills = [
+    'Python, Java, C++, C#, .NET, ASP.NET, node.js, JavaScript, HTML/CSS',
+    'Machine Learning: scikit-learn, TensorFlow, R. Statistics: SAS, SPSS.',
+    'Databases - Oracle 11g, MySQL, PostgreSQL, MongoDB, SQL Server 2012',
+    'Tools: Git, Jenkins, Docker, Kubernetes, JIRA, Microsoft Office (Excel, Word)',
+    "Agile/Scrum, project management, object-oriented design, REST API's",
+]
+
+
+class RegexTokenizerTests(SimpleTestCase):
+
+    def test_tokens(self):
+        self.assertEqual(regex_tokenize('C++, .NET and node.js (3.5 yrs)'),
+                         ['C++', ',', '.NET', 'and', 'node.js', '(', '3.5', 'yrs', ')'])
+        self.assertEqual(regex_tokenize("McDonald's, don't stop... J.P. Morgan Chase & Co."),
+                         ['McDonald', "'s", ',', 'do', "n't", 'stop', '...', 'J.P.', 'Morgan',
+                          'Chase', '&', 'Co', '.'])
+        self.assertEqual(regex_tokenize('C#; 1,000 users at 10:30, e-mail a@b.com'),
+                         ['C', '#', ';', '1,000', 'users', 'at', '10:30', ',', 'e-mail', 'a', '@', 'b.com'])
+
+
+class ContactInfoTests(SimpleTestCase):
+
+    def test_phone_formats(self):
+        phones = [cvparser.extract_phone_number({'contact_info': [line]}) for line in (
+            '(804) 263-8574', 'Cell: 804.263.8574', '804 263 8574', '8042638574',
+            # Without an area code
+            'Phone 263-8574', 'No phone here')]
+        self.assertEqual(phones, ['804-263-8574', '804-263-8574', '804-263-8574', '804-263-8574',
+                                  '263-8574', None])
+
+    def test_scan(self):
+        lines = ['John Smith', '1 Main St, Richmond, VA 23219', 'john@example.com | 263-8574']
+        self.assertEqual(cvparser.scan_contact_info(lines), {
+            'full_name': 'John Smith', 'telephone': '263-8574', 'email': 'john@example.com',
+            'street_address': '1 Main St', 'state': 'VA', 'zipcode': '23219'})
+
+
+class DateTests(SimpleTestCase):
+
+    def test_formats(self):
+        latest = datetime.datetime(2020, 1, 1)
+        dates = [find_dates(text, latest) for text in (
+            'Jan 2015 - Present', 'January 5, 2015 \u2013 Current', "Sept. '15 - now", '05/2016 to date',
+            '2012-2014', '2016-05', '05/12/2016', 'March 2021', 'Room 1234', '02/30/2016')]
+        self.assertEqual(dates, [
+            [datetime.datetime(2015, 1, 1), None], [datetime.datetime(2015, 1, 5), None],
+            [datetime.datetime(2015, 9, 1), None], [datetime.datetime(2016, 5, 1), None],
+            [datetime.datetime(2012, 1, 1), datetime.datetime(2014, 1, 1)], [datetime.datetime(2016, 5, 1)],
+            [datetime.datetime(2016, 5, 12)],
+            # Later than latest, not a year and an impossible day
+            [], [], []])
+
+    def test_period(self):
+        index = DateIndex(['Oracle', 'Analyst', 'Jan 2015 - Present', 'Best Buy', '2008 2009 2010'])
+        self.assertEqual([index.period(i) for i in range(5)], [
+            [datetime.datetime(2015, 1, 1), None], [datetime.datetime(2015, 1, 1), None],
+            [datetime.datetime(2015, 1, 1), None], [datetime.datetime(2008, 1, 1), datetime.datetime(2009, 1, 1)],
+            [datetime.datetime(2008, 1, 1), datetime.datetime(2009, 1, 1)]])
+
+    def test_work_history(self):
+        with mock.patch.object(cvparser, 'word_tokenize', regex_tokenize), \
+                mock.patch.object(cvparser, 'LOOKUP_BACKEND', 'local'):
+            companies = cvparser.extract_company_info(cvparser.segment(sample_work_history), sample_work_history)
+
+        self.assertEqual({(company['organization'], company['start_date'], company['end_date'])
+                          for company in companies}, {
+            ('Dominion Resources, Inc.', datetime.datetime(2015, 1, 1), None),
+            ('Oracle Corp', datetime.datetime(2010, 6, 1), datetime.datetime(2014, 12, 1)),
+            ('J.P. Morgan Chase & Co.', datetime.datetime(2006, 5, 1), datetime.datetime(2008, 7, 1))})
+
+
+class SegmentTests(SimpleTestCase):
+
+    def test_sections(self):
+        lines = ['John Smith', 'Objective', 'skills in everything', 'PROFESSIONAL EXPERIENCE', 'Oracle',
+                 'Skills and Abilities', 'Python', 'Work History', 'Best Buy', 'Education', 'VCU', 'Awards',
+                 "Dean's list"]
+        self.assertEqual(cvparser.segment(lines), {
+            'contact_info': ['John Smith'],
+            # A line starting in lower case is never a header
+            'objective': {'objective': ['Objective', 'skills in everything']},
+            'work_and_employment': {'professional experience': ['PROFESSIONAL EXPERIENCE', 'Oracle'],
+                                    'work history': ['Work History', 'Best Buy']},
+            'skills': {'skills': ['Skills and Abilities', 'Python']},
+            'education_and_training': {'education': ['Education', 'VCU', 'Awards', "Dean's list"]},
+            'accomplishments': {},
+            'misc': {},
+        })
+
+    def test_no_sections(self):
+        self.assertEqual(cvparser.segment(['John Smith', 'Python'])['contact_info'], ['John Smith', 'Python'])
+
+
+class SkillMatcherTests(SimpleTestCase):
+
+    def test_longest_match(self):
+        matcher = SkillMatcher(str.split)
+        for phrase, skill in [('Database', 'Database'), ('Database Administration', 'DBA'), ('C++', 'C++'),
+                              ('SQL', 'SQL'), ('Structured Query Language', 'SQL'), ('SQL', 'Structured SQL')]:
+            matcher.add(phrase, skill)
+
+        # A phrase registered twice keeps its first skill
+        self.assertEqual(len(matcher), 5)
+        # The canonical name Database inside Database Administration counts too
+        lines = ['Database Administration C++ and SQL', 'Database Structured Query Language']
+        self.assertEqual(dict(matcher.count(lines)), {'DBA': 1, 'C++': 1, 'SQL': 2, 'Database': 2})
+
+        with tempfile.TemporaryDirectory() as directory:
+            sections = {}
+            compile_matcher(matcher, sections)
+            write_artifact(os.path.join(directory, 'skills'), sections, {})
+            compiled = CompiledSkillMatcher(str.split, Artifact(os.path.join(directory, 'skills')))
+            self.assertEqual((len(compiled), compiled.count(lines)), (len(matcher), matcher.count(lines)))
+
+    def test_dictionary(self):
+        matcher = build_skill_matcher(lambda text: text.lower().split(),
+                                      os.path.join(settings.BASE_DIR, 'respars.sqlite3'),
+                                      os.path.join(settings.BASE_DIR, 'elasticsearch-dump', 'skillsets.json.gz'))
+        lines = ['python java c++ c# .net asp.net node.js javascript', 'oracle access manager and oracle 11g',
+                 'sap hana', 'project manager business analyst', 'microsoft sql server 2012']
+        # Multi-word names match as a whole and the canonical names inside them count too.
+        # Job titles in the dictionary count as skills.
+        self.assertEqual(dict(matcher.count(lines)), {
+            'Python': 1, 'JAVA': 1, 'C++': 1, 'C#': 1, '.Net': 1, 'ASP.NET': 1, 'node.js': 1, 'Javascript': 1,
+            'Oracle Access Manager': 1, 'Oracle': 2, 'ACCESS': 1, 'Oracle 11g': 1, 'SAP HANA': 1, 'SAP': 1,
+            'Project Manager': 1, 'Business Analyst': 1, 'SQL Server': 1, 'SQL': 1})
+
+
+@skipUnless(has_nltk_data, 'NLTK punkt and stopwords data are not installed')
+class TokenizerEquivalenceTests(SimpleTestCase):
+    """
+    The regex tokenizer must give the same skills and companies as NLTK.
+    """
+
+    def _skills(self, tokenize):
+        stop_words = resources.get('stop_words')
+        matcher = build_skill_matcher(
+            lambda text: [token.lower() for token in tokenize(text) if token not in stop_words],
+            resources.data_path('respars.sqlite3'),
+            resources.data_path('elasticsearch-dump', 'skillsets.json.gz'))
+        return sorted(matcher.count(sample_skills))
+
+    def _companies(self, tokenize):
+        cvparser.company_key.cache_clear()
+        try:
+            with mock.patch.object(cvparser, 'word_tokenize', tokenize), \
+                    mock.patch.object(cvparser, 'LOOKUP_BACKEND', 'local'), \
+                    mock.patch.dict(resources.resources):
+                # Build the company keys with this tokenizer, not from the artifact
+                resources.resources['artifact'] = None
+                resources.resources.pop('company_keys', None)
+                resume_segments = cvparser.segment(sample_work_history)
+                return cvparser.extract_company_info(resume_segments, sample_work_history)
+        finally:
+            cvparser.company_key.cache_clear()
+
+    def test_skills(self):
+        skills = self._skills(regex_tokenize)
+        self.assertTrue(skills)
+        self.assertEqual(skills, self._skills(nltk_tokenize))
+
+    def test_companies(self):
+        companies = self._companies(regex_tokenize)
+        self.assertTrue(companies)
+        self.assertEqual(companies, self._companies(nltk_tokenize))
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _allocate(size):
+    return len(bytearray(size))
+
+
+class SandboxPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = SandboxPool(2, timeout=1, max_memory=256 * 1024 * 1024, max_tasks=2)
+
+    def test_run(self):
+        self.assertEqual(self.pool.map(_sleep, [(0.1,), (0.2,)]), [0.1, 0.2])
+
+    def test_limits(self):
+        with self.assertRaises(ExtractionError) as raised:
+            self.pool.run(_sleep, 10)
+        self.assertEqual(raised.exception.code, 'timeout')
+
+        with self.assertRaises(ExtractionError) as raised:
+            self.pool.run(_allocate, 1024 * 1024 * 1024)
+        self.assertEqual(raised.exception.code, 'too_large')
+
+        # The killed workers are replaced
+        self.assertEqual(self.pool.run(_sleep, 0), 0)
+
+    def test_recycling(self):
+        pids = [self.pool.run(os.getpid) for _ in range(4)]
+        self.assertEqual(len(set(pids)), 2)
+
+
+def _make_docx(body, header=''):
+    """
+    :param body: WordprocessingML of the document body
+    :param header: Text of a page header
+    :return: Bytes of a docx file
+    """
+    document = io.BytesIO()
+    with zipfile.ZipFile(document, 'w') as package:
+        package.writestr('[Content_Types].xml', '<Types/>')
+        package.writestr('word/document.xml', '<w:document xmlns:w="%s"><w:body>%s</w:body></w:document>'
+                         % (cvparser.w_namespace[1:-1], body))
+        package.writestr('word/header1.xml', '<w:hdr xmlns:w="%s"><w:p><w:r><w:t>%s</w:t></w:r></w:p></w:hdr>'
+                         % (cvparser.w_namespace[1:-1], header))
+    return document.getvalue()
+
+
+class DocxTests(SimpleTestCase):
+
+    def test_lines(self):
+        data = _make_docx(
+            '<w:p><w:r><w:t>John</w:t></w:r><w:r><w:t xml:space="preserve"> Smith </w:t></w:r></w:p>'
+            '<w:p><w:r><w:t>Skills</w:t><w:tab/><w:t>Python</w:t><w:br/><w:t>SQL</w:t></w:r></w:p>'
+            '<w:p></w:p>'
+            '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Oracle</w:t></w:r></w:p></w:tc>'
+            '<w:tc><w:p><w:r><w:t>2012 - 2014</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+            '<w:p><w:r><w:t>Outer</w:t></w:r><w:r><w:pict><w:txbxContent><w:p><w:r><w:t>Text box</w:t></w:r></w:p>'
+            '</w:txbxContent></w:pict></w:r><w:r><w:t>paragraph</w:t></w:r></w:p>',
+            header='Page header')
+        self.assertEqual(list(cvparser.iter_docx_lines(io.BytesIO(data))), [
+            'John Smith', 'Skills Python', 'SQL', 'Oracle', '2012 - 2014', 'Outer', 'Text box', 'paragraph'])
+
+    def test_broken(self):
+        data = _make_docx('<w:p><w:r><w:t>John Smith</w:t></w:r></w:p><w:p><w:r><w:t>Python')
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(list(cvparser.iter_docx_lines(io.BytesIO(data))), ['John Smith'])
+
+
+def _make_pdf(pages):
+    """
+    :param pages: List of the text of each page, one line per page
+    :return: Bytes of a PDF with one page per text
+    """
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               '<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                   ' '.join('%d 0 R' % (4 + 2 * i) for i in range(len(pages))), len(pages)),
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for i, text in enumerate(pages):
+        stream = 'BT /F1 12 Tf 72 720 Td (%s) Tj ET' % text
+        objects.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+                       '/Resources << /Font << /F1 3 0 R >> >> >>' % (5 + 2 * i))
+        objects.append('<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += ('%d 0 obj\n%s\nendobj\n' % (number, body)).encode('latin-1')
+    xref = len(pdf)
+    pdf += ('xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)).encode('latin-1')
+    pdf += ''.join('%010d 00000 n \n' % offset for offset in offsets).encode('latin-1')
+    pdf += ('trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)).encode('latin-1')
+    return pdf
+
+
+class FileTypeTests(SimpleTestCase):
+
+    def test_contents(self):
+        other_zip = io.BytesIO()
+        with zipfile.ZipFile(other_zip, 'w') as package:
+            package.writestr('resume.txt', 'John Smith')
+
+        self.assertEqual([cvparser.file_type(data) for data in (
+            _make_pdf(['John Smith']), b'\r\n' + _make_pdf(['John Smith']), _make_docx(''),
+            other_zip.getvalue(), b'PK\x03\x04 truncated', b'John Smith')], ['pdf', 'pdf', 'docx', None, None, None])
+
+    def test_mislabeled_upload(self):
+        uploads = [SimpleUploadedFile('resume.docx', _make_pdf(['John Smith', 'john@example.com'])),
+                   SimpleUploadedFile('resume.pdf', _make_docx('<w:p><w:r><w:t>John Smith</w:t></w:r></w:p>'
+                                                               '<w:p><w:r><w:t>john@example.com</w:t></w:r></w:p>'))]
+        for upload in uploads:
+            resume_data = cvparser.process(upload, ['contact_info'])
+            self.assertEqual(resume_data['contact_info']['contact_method']['email'], 'john@example.com')
+
+        self.assertIsNone(cvparser.process(SimpleUploadedFile('resume.pdf', b'John Smith')))
+
+
+class PdfTests(SimpleTestCase):
+
+    def test_parallel_page_ranges(self):
+        data = _make_pdf(['Page %d' % page for page in range(1, 6)])
+        # A default page limit below maxpages must not cut off the later page ranges
+        patches = [mock.patch.object(cvparser, 'PDF_MAX_PAGES', 1),
+                   mock.patch.object(cvparser, 'PDF_PARALLEL_MIN_PAGES', 2),
+                   mock.patch.object(cvparser, 'PDF_PARALLEL_WORKERS', 2),
+                   mock.patch.object(cvparser, 'EXTRACT_WORKERS', 2),
+                   mock.patch.object(cvparser, 'extract_pool', None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.assertEqual(cvparser.read_pdf_lines(map_file(data), 4), ['Page 1', 'Page 2', 'Page 3', 'Page 4'])
+        self.assertEqual(cvparser.read_pdf_lines(map_file(data)), ['Page 1'])
+
+
+def _reused_client(client, connection):
+    connection.send((cvparser._get_es() is client, cvparser.es_version, cvparser.extract_pool))
+
+
+class ForkTests(SimpleTestCase):
+
+    @mock.patch.object(cvparser, 'Elasticsearch', lambda *args, **kwargs: object())
+    def test_child_clients(self):
+        client = cvparser._get_es()
+        self.addCleanup(setattr, cvparser, 'es_client', None)
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        with mock.patch.object(cvparser, 'es_version', ('es-1', time.monotonic())), \
+                mock.patch.object(cvparser, 'extract_pool', object()):
+            worker = multiprocessing.Process(target=_reused_client, args=(client, sender))
+            worker.start()
+            worker.join()
+
+        self.assertEqual(receiver.recv(), (False, (None, 0), None))
+
+
+def _count_file(filetype):
+    metrics.files.inc(filetype=filetype)
+    metrics.flush()
+
+
+class MetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # No flush thread, the test flushes
+        patches = [mock.patch.object(metrics, 'METRICS_DIR', directory.name),
+                   mock.patch.object(metrics, '_path', None), mock.patch.object(metrics, '_flusher', object()),
+                   mock.patch.object(metrics.files, '_values', {})]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_processes_are_added_up(self):
+        metrics.files.inc(filetype='pdf')
+        for _ in range(2):
+            # Forked after counting, a child does not report its parent's values again
+            worker = multiprocessing.Process(target=_count_file, args=('pdf',))
+            worker.start()
+            worker.join()
+
+        rendered = metrics.render()
+        self.assertIn('resumeparser_files_total{filetype="pdf"} 3.0\n', rendered)
+        self.assertEqual(len(os.listdir(metrics.METRICS_DIR)), 3)
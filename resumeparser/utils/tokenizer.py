@@ -0,0 +1,52 @@
+"""
+Word tokenizer for the parser hot paths.
+
+One compiled pattern reproduces the splits of NLTK's word_tokenize that matter
+for resume lines: symbols and brackets become tokens of their own, contractions
+are split off and words keep inner periods, hyphens, slashes and trailing
+pluses ("node.js", "e-mail", "Python/Java", "C++"). Unlike word_tokenize it
+needs no Punkt model and a word final period is always split off, not only at
+sentence ends. Set RESUMEPARSER_TOKENIZER=nltk to use word_tokenize instead.
+"""
+import os
+import re
+from functools import lru_cache
+
+TOKENIZER = os.environ.get('RESUMEPARSER_TOKENIZER', 'regex')
+
+token_pattern = re.compile(
+    r"\.\.\.|--"
+    # Contractions, "don't" -> "do", "n't" and "John's" -> "John", "'s"
+    r"|\w+?(?=n't\b)|n't\b|'(?:s|m|d|ll|re|ve)\b"
+    # Initialisms such as "J.P." keep their periods
+    r"|(?:[^\W\d_]\.){2,}"
+    # Words, a leading period is kept as in ".NET"
+    r"|(?:(?<![\w.])\.)?\w+(?:(?:[-./+]|'(?!(?:s|m|d|ll|re|ve)\b)|[:,](?=\d))\w+)*\+*"
+    r"|\++|[^\w\s]",
+    re.IGNORECASE | re.UNICODE)
+
+
+def regex_tokenize(text):
+    """
+    :param text: Text to split
+    :return: List of tokens
+    """
+    return token_pattern.findall(text)
+
+
+@lru_cache(maxsize=8192)
+def _nltk_tokenize(text):
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+    return tuple(nltk_word_tokenize(text))
+
+
+def nltk_tokenize(text):
+    """
+    NLTK word_tokenize, cached since the same names and lines recur across resumes.
+    :param text: Text to split
+    :return: List of tokens
+    """
+    return list(_nltk_tokenize(text))
+
+
+word_tokenize = nltk_tokenize if TOKENIZER == 'nltk' else regex_tokenize
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "resumeparser.settings")
 
 application = get_wsgi_application()
+
+# Load parser resources once. Served with gunicorn --preload (see gunicorn.conf.py)
+# this runs in the master, and forked workers share the loaded objects.
+from resumeparser.utils import cvparser, resources  # noqa: E402
+
+resources.warm()
+
+# Keep the garbage collector from touching, and so copying, the preloaded objects
+if hasattr(gc, 'freeze'):
+    gc.freeze()